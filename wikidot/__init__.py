@@ -24,4 +24,4 @@ license:
     MIT License
 """
 
-from . import base, connector, decorator, exceptions, file, forum, logger, page, site, tag, user, variables, vote  # noqa: F401
+from . import base, cache, connector, decorator, exceptions, file, forum, journal, logger, mirror, page, scheduler, site, tag, user, variables, vote  # noqa: F401
@@ -14,7 +14,7 @@ license:
 
 """
 
-from . import connector, decorator, exceptions, logger, variables
+from . import cache, connector, decorator, exceptions, journal, logger, scheduler, variables
 
 import asyncio
 from bs4 import BeautifulSoup as bs4
@@ -22,7 +22,11 @@ import httpx
 import feedparser
 
 import math
-from typing import Union, Optional, Tuple, List
+import os
+import hashlib
+import random
+from array import array
+from typing import Union, Optional, Tuple, List, NamedTuple
 from datetime import datetime
 from time import mktime
 import re
@@ -59,6 +63,8 @@ def author_parser(printuserelement):
         author_id = int(
             str(_author["onclick"]).replace("WIKIDOT.page.listeners.userInfo(", "").replace("); return false;", "")
         )
+        # both unix name and id are known here
+        cache.userid[cache.unixname(author_unix)] = (author_id, datetime.now())
     return author_name, author_unix, author_id
 
 
@@ -70,6 +76,19 @@ def odate_parser(odateelement):
             return datetime.fromtimestamp(unixtime)
 
 
+def pager_parser(pagerelement) -> int:
+    # "page X of Y"
+    _no = pagerelement.find("span", class_="pager-no")
+    if _no is not None:
+        _total = re.search(r"of\s+(\d+)", _no.get_text())
+        if _total is not None:
+            return int(_total.group(1))
+    # number links (the last page has no "next" link)
+    _nums = [int(_s.get_text().strip()) for _s in pagerelement.find_all("span", class_=("target", "current"))
+             if _s.get_text().strip().isdigit()]
+    return max(_nums) if _nums else 1
+
+
 # --------------------
 # SessionControl
 # --------------------
@@ -236,21 +255,78 @@ async def user_logout() -> bool:
         return False
 
 
-async def user_getid(*, user: str) -> int:
+async def user_getid(*, user: str, negativettl: float = 86400.0) -> Optional[int]:
+    """|Coroutine| Get user id from user name
+
+    Arguments:
+        user: str
+            user name or unix name
+        negativettl: float, by default 86400.0
+            seconds to trust cached "not found" results
+
+    Raises:
+        wikidot.exceptions.RequestFailedError(msg, html_response_code)
+            user:info page returned unexpected status code
+
+    Returns:
+        Optional[int]
+            user id, or None if the user is not found
+
+    Results are kept in wikidot.cache.userid, which is also filled by every parsed printuser element.
+    """
+    key = cache.unixname(user)
+    if key in cache.userid:
+        userid, stored = cache.userid[key]
+        if userid is not None or (datetime.now() - stored).total_seconds() < negativettl:
+            return userid
+
     user = user.replace(" ", "-").lstrip("_")
-    async with httpx.AsyncClient() as client:
-        _source = await client.get(
-            f"http://www.wikidot.com/user:info/{user}",
-            timeout=10
+    _source = await connector.get(
+        url=f"http://www.wikidot.com/user:info/{user}",
+        timeout=10
+    )
+    if _source.status_code != 200:
+        raise exceptions.RequestFailedError(
+            "Status code is not 200.", _source.status_code
         )
-        if _source.status_code != 200:
-            raise
 
-        _contents = bs4(_source.text, 'lxml')
-        if len(_contents.select("#page-content .error-block")) != 0:
-            return None
-        else:
-            return int(_contents.select(".profile-title img")[0]["src"].replace("http://www.wikidot.com/avatar.php?userid=", "").split("&")[0])
+    _contents = bs4(_source.text, 'lxml')
+    if len(_contents.select("#page-content .error-block")) != 0:
+        userid = None
+    else:
+        userid = int(_contents.select(".profile-title img")[0]["src"].replace("http://www.wikidot.com/avatar.php?userid=", "").split("&")[0])
+
+    cache.userid[key] = (userid, datetime.now())
+
+    return userid
+
+
+async def user_getid_mass(*, limit: int = 10, users: List[str], negativettl: float = 86400.0, errors: Optional[list] = None) -> List[Tuple[str, Optional[int]]]:
+    """|Coroutine| Get user ids of multiple users
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        users: list[str]
+            list of user names or unix names
+        negativettl: float, by default 86400.0
+            seconds to trust cached "not found" results
+        errors: Optional[list], by default None
+            if given, failed targets are appended as wikidot.scheduler.MassError
+            and only successful results are returned. (retry with [e.target for e in errors])
+
+    Returns:
+        list
+            [(user, Optional[user_id]), .....]
+    """
+    async def _innerfunc(user: str):
+        # answer known users without sending a request
+        _cached = cache.userid.get(cache.unixname(user))
+        if _cached is not None and _cached[0] is not None:
+            return user, _cached[0]
+        return user, await user_getid(user=user, negativettl=negativettl)
+
+    return await scheduler.runpool(_innerfunc, users, limit=limit, errors=errors)
 
 
 # --------------------
@@ -491,7 +567,8 @@ async def page_getdata(*, url: str, main_key: str = "fullname", module_body: Opt
     return _dic_res
 
 
-async def page_getdata_mass(*, limit: int = 10, url: str, main_key: str = "fullname", module_body: Optional[List[str]] = None, **kwargs) -> Optional[dict]:
+async def page_getdata_mass(*, limit: int = 10, url: str, main_key: str = "fullname", module_body: Optional[List[str]] = None,
+                            offsets: Optional[List[int]] = None, errors: Optional[list] = None, **kwargs) -> Optional[dict]:
     """|AMC| |Coroutine| Get all pages' data with base.page_getdata function
 
     Arguments:
@@ -515,6 +592,11 @@ async def page_getdata_mass(*, limit: int = 10, url: str, main_key: str = "fulln
                     "parent_fullname", "comments", "size",
                     "rating_votes", "rating", "revisions", "tags", "_tags"
                 ]
+        offsets: Optional[list[int]], by default None
+            if given, only the ListPages pages starting at these offsets (multiples of 250) are requested.
+        errors: Optional[list], by default None
+            if given, failed ListPages pages are appended as wikidot.scheduler.MassError (target is the offset)
+            and the other pages are returned. (retry with offsets=[e.target for e in errors])
         <listpages_module_arguments>: **kwargs
             other arguments that can be given to ListPages Module on wikidot.com
             doc: https://www.wikidot.com/doc-modules:listpages-module
@@ -563,8 +645,9 @@ async def page_getdata_mass(*, limit: int = 10, url: str, main_key: str = "fulln
     """
     MEMO:
         1. p＿age_getdataでlistpagesの最初のページを取得、総ページ数とcontentsを返す
-        2. 総ページ数-1の回数分、offsetに250*(ページ数-1)を入れてgatherに放り込んで非同期実行
+        2. 総ページ数-1の回数分、offsetに250*(ページ数-1)を入れてworkerpoolで非同期実行
         3. 2の結果群をfor文で回して1のcontentsをupdate
+        ・offsetsを指定した場合はそのoffsetのページのみ取得する(errorsからの再実行用)
     """
 
     _args = {
@@ -577,39 +660,27 @@ async def page_getdata_mass(*, limit: int = 10, url: str, main_key: str = "fulln
     if kwargs is not None:
         _args.update(kwargs)
 
-    async def _getfirstpage(*, url: str):
-        _r = await page_getdata(**_args)
-        if _r is None:
-            return 0, None
-        else:
-            return _r["total"], _r["contents"]
-
-    async def _getlastpage(*, limit: int, url: str, total: int):
-
-        sema = asyncio.Semaphore(limit)
-
-        async def __innerfunc(offset):
-            async with sema:
-                _args.update({
-                    "offset": offset,
-                    "limit": 250
-                })
-                _r = await page_getdata(**_args)
-                return _r["contents"]
-
-        stmt = []
-        for i in range(1, total):
-            stmt.append(__innerfunc(offset=250 * i))
+    async def _getpage(offset: int):
+        _r = await page_getdata(**{**_args, "offset": offset, "limit": 250})
+        return {} if _r is None else _r["contents"]
 
-        return await asyncio.gather(*stmt)
-
-    total, _r = await _getfirstpage(url=url)
+    if offsets is not None:
+        _r = {}
+        for _rr in await scheduler.runpool(_getpage, offsets, limit=limit, errors=errors):
+            _r.update(_rr)
+        return _r
 
-    if _r is not None:
-        _rs = await _getlastpage(url=url, limit=limit, total=total)
+    _first = await scheduler.runpool(lambda _: page_getdata(**_args), [0], limit=1, errors=errors)
+    if not _first and errors is None:
+        # the first page was cut off by the deadline: this is not "no matching page"
+        scheduler.checkdeadline()
+    if not _first or _first[0] is None:
+        return None
+    total, _r = _first[0]["total"], _first[0]["contents"]
 
-        for _rr in _rs:
-            _r.update(_rr)
+    _rs = await scheduler.runpool(_getpage, (250 * i for i in range(1, total)), limit=limit, errors=errors)
+    for _rr in _rs:
+        _r.update(_rr)
 
     return _r
 
@@ -619,9 +690,12 @@ async def page_getdata_mass(*, limit: int = 10, url: str, main_key: str = "fulln
 # --------------------
 
 
-async def page_getid(*, url: str, fullname: str) -> Optional[int]:
+async def page_getid(*, url: str, fullname: str, refresh: bool = False) -> Optional[int]:
     """|Coroutine| Get PageID of specific page
 
+    Found ids are kept in wikidot.cache.pageid (save/load with wikidot.cache.save_lookups / load_lookups),
+    and known pages are answered without HTTP request.
+
     Arguments:
         url: str
             target site url
@@ -629,6 +703,8 @@ async def page_getid(*, url: str, fullname: str) -> Optional[int]:
         fullname: str
             target page fullname
             eg: "main", "scp-001-jp", "component:theme
+        refresh: bool, by default False
+            ignore the cached id and request again
 
     Raises:
         wikidot.exceptions.UnexpectedError(msg, reason)
@@ -650,54 +726,64 @@ async def page_getid(*, url: str, fullname: str) -> Optional[int]:
     """
     # TODO: タイムアウト時のエラーハンドリング
 
+    _cache = cache.pageid.setdefault(cache.site(url), {})
+    if not refresh and fullname in _cache:
+        return _cache[fullname]
+
     async def _innerfunc(*, url, fullname):
         # Support https connection
         if "http://" not in url and "https://" not in url:
             url = "http://" + url
-        async with httpx.AsyncClient() as client:
-            _source = await client.get(
-                f"{url}/{fullname}/noredirect/true/norender/true",
-                headers=variables.request_header,
-                timeout=60
+        _source = await connector.get(
+            url=f"{url}/{fullname}/noredirect/true/norender/true",
+            headers=variables.request_header,
+            timeout=60
+        )
+
+        # 404
+        if _source.status_code == 404:
+            logger.warning(
+                f"GetID | http://{url}/{fullname} - Not Found"
             )
+            return None
+        elif _source.status_code != 200:
+            logger.error(
+                f"GetID | http://{url}/{fullname} - Status code is {_source.status_code}"
+            )
+            raise
 
-            # 404
-            if _source.status_code == 404:
-                logger.warning(
-                    f"GetID | http://{url}/{fullname} - Not Found"
-                )
+        _contents = bs4(_source.text, 'lxml')
+        _contents = _contents.find("head")
+        _contents = _contents.find_all(
+            "script", attrs={"type": "text/javascript"})
+        for _c in _contents:
+            _c = _c.string
+            if "_public" in str(_c):
                 return None
-            elif _source.status_code != 200:
-                logger.error(
-                    f"GetID | http://{url}/{fullname} - Status code is {_source.status_code}"
-                )
-                raise
+            elif "WIKIREQUEST.info.pageId" in str(_c):
+                pageid = re.search(
+                    r"WIKIREQUEST\.info\.pageId = \d+;", _c).group()
+                pageid = re.search(r"\d+", pageid).group()
 
-            _contents = bs4(_source.text, 'lxml')
-            _contents = _contents.find("head")
-            _contents = _contents.find_all(
-                "script", attrs={"type": "text/javascript"})
-            for _c in _contents:
-                _c = _c.string
-                if "_public" in str(_c):
-                    return None
-                elif "WIKIREQUEST.info.pageId" in str(_c):
-                    pageid = re.search(
-                        r"WIKIREQUEST\.info\.pageId = \d+;", _c).group()
-                    pageid = re.search(r"\d+", pageid).group()
-
-                    logger.info(
-                        f"GetID | http://{url}/{fullname} - {pageid}"
-                    )
+                logger.info(
+                    f"GetID | http://{url}/{fullname} - {pageid}"
+                )
 
-                    return int(pageid)
+                return int(pageid)
 
     # Request
     cnt = 1
     end = False
     while end is False:
         try:
-            return await _innerfunc(url=url, fullname=fullname)
+            pageid = await _innerfunc(url=url, fullname=fullname)
+            if pageid is not None:
+                _cache[fullname] = pageid
+            else:
+                _cache.pop(fullname, None)
+            return pageid
+        except exceptions.DeadlineExceededError:
+            raise
         except Exception:
             if cnt < 5:
                 cnt += 1
@@ -708,7 +794,7 @@ async def page_getid(*, url: str, fullname: str) -> Optional[int]:
                 )
 
 
-async def page_getid_mass(*, limit: int = 10, url: str, targets: Union[list, tuple]) -> List[Tuple[str, Optional[int]]]:
+async def page_getid_mass(*, limit: int = 10, url: str, targets: Union[list, tuple], errors: Optional[list] = None) -> List[Tuple[str, Optional[int]]]:
     """|Coroutine| Get PageIDs of multiple pages
 
     Arguments:
@@ -720,6 +806,9 @@ async def page_getid_mass(*, limit: int = 10, url: str, targets: Union[list, tup
         targets: Union[list, tuple]
             list of target pages' fullname
             eg: ["scp-001", "scp-002", "component:theme"]
+        errors: Optional[list], by default None
+            if given, failed targets are appended as wikidot.scheduler.MassError
+            and only successful results are returned. (retry with [e.target for e in errors])
 
      Raises:
         wikidot.exceptions.UnexpectedError(msg, reason)
@@ -733,22 +822,19 @@ async def page_getid_mass(*, limit: int = 10, url: str, targets: Union[list, tup
     """
     """
     MEMO:
-        ・page_getidにURLとfullnameを与えてgatherに放り込んで非同期実行
+        ・page_getidにURLとfullnameを与えてworkerpoolで非同期実行
     """
 
-    sema = asyncio.Semaphore(limit)
-
-    async def _innerfunc(**kwargs):
-        async with sema:
-            pageid = await page_getid(**kwargs)
-            return (kwargs["fullname"], pageid)
+    _cache = cache.pageid.setdefault(cache.site(url), {})
 
-    stmt = []
-    for t in targets:
-        stmt.append(_innerfunc(
-            **{"url": url, "fullname": t}))
+    async def _innerfunc(fullname):
+        # answer known pages without sending a request
+        if fullname in _cache:
+            return (fullname, _cache[fullname])
+        pageid = await page_getid(url=url, fullname=fullname)
+        return (fullname, pageid)
 
-    return await asyncio.gather(*stmt)
+    return await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
 
 
 # --------------------
@@ -823,12 +909,14 @@ async def page_getsource(*, url: str, pageid: int) -> Optional[str]:
         else:
             raise exceptions.StatusIsNotOKError(
                 "Wikidot returns unexpected status", e.args[1])
+    except exceptions.DeadlineExceededError:
+        raise
     except Exception:
         raise exceptions.UnexpectedError(
             "Unexpected Error occurred.", "undefined")
 
 
-async def page_getsource_mass(*, limit: int = 10, url: str, targets: Union[list, tuple]) -> List[Tuple[int, Optional[str]]]:
+async def page_getsource_mass(*, limit: int = 10, url: str, targets: Union[list, tuple], errors: Optional[list] = None) -> List[Tuple[int, Optional[str]]]:
     """|AMC| |Coroutine| Get source of specific pages
 
     Arguments:
@@ -839,6 +927,9 @@ async def page_getsource_mass(*, limit: int = 10, url: str, targets: Union[list,
             eg: "scp-jp.wikidot.com", "scpwiki.com"
         targets: Union[list, tuple]
             list of target pages' id
+        errors: Optional[list], by default None
+            if given, failed targets are appended as wikidot.scheduler.MassError
+            and only successful results are returned. (retry with [e.target for e in errors])
 
     Raises:
         exceptions.StatusIsNotOKError(msg, status_code)
@@ -856,19 +947,11 @@ async def page_getsource_mass(*, limit: int = 10, url: str, targets: Union[list,
 
     """
 
-    sema = asyncio.Semaphore(limit)
-
-    async def _innerfunc(**kwargs):
-        async with sema:
-            source = await page_getsource(**kwargs)
-            return (kwargs["pageid"], source)
-
-    stmt = []
-    for t in targets:
-        stmt.append(_innerfunc(
-            **{"url": url, "pageid": t}))
+    async def _innerfunc(pageid):
+        source = await page_getsource(url=url, pageid=pageid)
+        return (pageid, source)
 
-    return await asyncio.gather(*stmt)
+    return await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
 
 
 # --------------------
@@ -1029,19 +1112,12 @@ async def page_gethistory(*, url: str, pageid: int):
     return r
 
 
-async def page_gethistory_mass(*, limit: int = 10, url: str, targets: List[int]):
-    sema = asyncio.Semaphore(limit)
-
-    async def _innerfunc(**kwargs):
-        async with sema:
-            history = await page_gethistory(**kwargs)
-            return (kwargs["pageid"], history)
-
-    stmt = []
-    for t in targets:
-        stmt.append(_innerfunc(**{"url": url, "pageid": t}))
+async def page_gethistory_mass(*, limit: int = 10, url: str, targets: List[int], errors: Optional[list] = None):
+    async def _innerfunc(pageid):
+        history = await page_gethistory(url=url, pageid=pageid)
+        return (pageid, history)
 
-    _r = await asyncio.gather(*stmt)
+    _r = await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
     r = []
     for _r_id, _r_list in _r:
         r.append((_r_id, tuple(_r_list)))
@@ -1053,6 +1129,107 @@ async def page_gethistory_mass(*, limit: int = 10, url: str, targets: List[int])
 # --------------------
 
 
+@decorator.require_session
+async def page_lock(*, url: str, pageid: int, forceedit: bool = False) -> dict:
+    """|AMC| |Coroutine| |SessionRequired| Open the editor of the page and acquire the edit lock
+
+    Arguments:
+        url: str
+            target site url
+        pageid: int
+            target page's id
+        forceedit: bool, by default False
+            Whether to automatically unlock when the page is locked
+
+    Raises:
+        wikidot.exceptions.StatusIsNotOKError(msg, status_code)
+            "page_locked": the page is locked by another user
+
+    Returns:
+        dict
+            {"lock_id": str, "lock_secret": str, "page_revision_id": str}
+    """
+    _body = {
+        "mode": "page",
+        "moduleName": "edit/PageEditModule",
+        "page_id": pageid
+    }
+    # Lockを強制解除するか否か
+    if forceedit is True:
+        _body["force_lock"] = "yes"
+
+    logger.info(
+        f"OpenEditor | url: {url}, page: {pageid}"
+    )
+    _editor = await connector.connect(
+        url=url,
+        body=_body
+    )
+    if "locked" in _editor or "other_locks" in _editor:
+        raise exceptions.StatusIsNotOKError("Target page is locked.", "page_locked")
+
+    return {
+        "lock_id": _editor["lock_id"],
+        "lock_secret": _editor["lock_secret"],
+        "page_revision_id": _editor["page_revision_id"]
+    }
+
+
+@decorator.require_session
+async def page_unlock(*, url: str, pageid: int, lock: dict) -> bool:
+    """|AMC| |Coroutine| |SessionRequired| Release the edit lock acquired by page_lock
+
+    Returns:
+        bool
+            whether the lock was released. This function does not raise.
+    """
+    try:
+        await connector.connect(
+            url=url,
+            body={
+                "action": "WikiPageAction",
+                "event": "removePageEditLock",
+                "moduleName": "Empty",
+                "page_id": pageid,
+                "lock_id": lock["lock_id"],
+                "lock_secret": lock["lock_secret"],
+                "leave_draft": "false"
+            }
+        )
+        return True
+    except Exception:
+        logger.error(f"Unlock | failed to release the lock | {pageid}", exc_info=True)
+        return False
+
+
+@decorator.require_session
+async def page_save(*, url: str, fullname: str, pageid: Union[int, str], lock: dict, title: str = "", content: str = "", comment: str = ""):
+    """|AMC| |Coroutine| |SessionRequired| Save the page with the lock acquired by page_lock
+
+    For a new page, give pageid "" and lock {"lock_id": "", "lock_secret": "", "page_revision_id": ""}.
+    """
+    logger.info(
+        f"Edit | page: {fullname}({pageid}), title: {title}"
+    )
+    return await connector.connect(
+        url=url,
+        body={
+            "action": "WikiPageAction",
+            "event": "savePage",
+            "moduleName": "Empty",
+            "mode": "page",
+            "lock_id": lock["lock_id"],
+            "lock_secret": lock["lock_secret"],
+            "page_revision_id": lock["page_revision_id"],
+            "wiki_page": fullname,
+            "page_id": pageid,
+            "title": title,
+            "source": content,
+            "comments": comment
+        }
+    )
+
+
 @decorator.require_session
 async def page_edit(*, url: str, fullname: str, pageid: Optional[int] = None, title: str = "", content: str = "", comment: str = "", forceedit: bool = False) -> bool:
     """|AMC| |Coroutine| |SessionRequired| Edit specific page
@@ -1091,7 +1268,7 @@ async def page_edit(*, url: str, fullname: str, pageid: Optional[int] = None, ti
 
     # fullnameしか与えられなかったら自動でpageidを取りに行く
     if fullname is not None and pageid is None:
-        pageid = await page_getid(url=url, fullname=fullname)
+        pageid = await page_getid(url=url, fullname=fullname, refresh=True)
         # 該当ページがなかったら新規作成フラグを立てる
         if pageid is None:
             _f_newpage = True
@@ -1099,32 +1276,9 @@ async def page_edit(*, url: str, fullname: str, pageid: Optional[int] = None, ti
                 f"New Page: http://{url}/{fullname}"
             )
 
-    # Lockを強制解除するか否か
-    if forceedit is True:
-        _body = {
-            "mode": "page",
-            "moduleName": "edit/PageEditModule",
-            "page_id": pageid,
-            "force_lock": "yes"
-        }
-    else:
-        _body = {
-            "mode": "page",
-            "moduleName": "edit/PageEditModule",
-            "page_id": pageid
-        }
-
     # Editorを起動 lockidとrevidを取る
     if _f_newpage is False:
-        logger.info(
-            f"OpenEditor | url: {url}, page: {fullname}({pageid})"
-        )
-        _editor = await connector.connect(
-            url=url,
-            body=_body
-        )
-        if "locked" in _editor or "other_locks" in _editor:
-            raise exceptions.StatusIsNotOKError("Target page is locked.", "page_locked")
+        _editor = await page_lock(url=url, pageid=pageid, forceedit=forceedit)
 
     else:
         pageid = ""
@@ -1135,26 +1289,111 @@ async def page_edit(*, url: str, fullname: str, pageid: Optional[int] = None, ti
         }
 
     # Save
-    logger.info(
-        f"Edit | page: {fullname}({pageid}), title: {title}"
-    )
-    await connector.connect(
-        url=url,
-        body={
-            "action": "WikiPageAction",
-            "event": "savePage",
-            "moduleName": "Empty",
-            "mode": "page",
-            "lock_id": _editor["lock_id"],
-            "lock_secret": _editor["lock_secret"],
-            "page_revision_id": _editor["page_revision_id"],
-            "wiki_page": fullname,
-            "page_id": pageid,
-            "title": title,
-            "source": content,
-            "comments": comment
-        }
-    )
+    await page_save(url=url, fullname=fullname, pageid=pageid, lock=_editor, title=title, content=content, comment=comment)
+
+    return True
+
+
+@decorator.require_session
+async def page_edit_mass(*, limit: int = 10, url: str, targets: List[dict], forceedit: bool = False,
+                         journalpath: Optional[str] = None) -> List[Tuple[str, str, Optional[Exception]]]:
+    """|AMC| |Coroutine| |SessionRequired| Edit multiple pages
+
+    Arguments:
+        limit: int, by default 10
+            number of pages processed in parallel
+            write requests (lock acquisition and save) are limited by wikidot.scheduler.writegovernor
+        url: str
+            target site url
+        targets: list[dict]
+            [{"fullname": str, "title": str, "content": str, "comment": str, "pageid": Optional[int]}, ...]
+            "fullname" is required. If "pageid" is omitted, get automatically.
+            If the page does not exist, it is created.
+        forceedit: bool, by default False
+            Whether to automatically unlock when the page is locked
+        journalpath: Optional[str], by default None
+            journal file path (see wikidot.journal)
+            if given, each edit is recorded, and edits already done in the journal are skipped.
+
+    Returns:
+        list
+            [(fullname, status, exception), ...] in the order of targets
+            status: "saved", "created", "locked", "failed" or "skipped" (done in the journal)
+            exception is None unless status is "locked" or "failed"
+    """
+    """
+    MEMO:
+        ・ページごとに ID解決 -> Lock取得 -> 保存 を行うが、ページ間では並行して進める(パイプライン)
+            -> ID解決はlimit、Lock取得・保存はさらにwritegovernor(connector経由)で制限
+        ・保存に失敗したらLockを解放する
+            -> 期限切れ・キャンセルでも解放できるよう、scheduler.cleanupでジョブの期限の外で実行する
+    """
+    _done = journal.done(path=journalpath) if journalpath is not None else set()
+
+    def _journal(key: str, state: str, **fields):
+        if journalpath is not None:
+            journal.write(path=journalpath, key=key, state=state, **fields)
+
+    async def _unlock(fullname: str, pageid: int, lock: dict):
+        # the job deadline may have passed or the job may be cancelled: release the lock anyway
+        await scheduler.cleanup(lambda: page_unlock(url=url, pageid=pageid, lock=lock), name=f"EditMass unlock {fullname}")
+
+    async def _innerfunc(target: dict):
+        fullname = target["fullname"]
+        pageid = target.get("pageid")
+        lock = None
+        key = journal.makekey(
+            "edit", cache.site(url), fullname,
+            hashlib.sha1("\0".join((target.get("title", ""), target.get("content", ""), target.get("comment", ""))).encode()).hexdigest()
+        )
+        if key in _done:
+            return fullname, "skipped", None
+        _journal(key, "intent", action="edit", target=fullname)
+        try:
+            if pageid is None:
+                # cached ids are not trusted for writes (the page may have been renamed or recreated)
+                pageid = await page_getid(url=url, fullname=fullname, refresh=True)
+
+            if pageid is None:
+                status = "created"
+                pageid = ""
+                _lock = {
+                    "lock_id": "",
+                    "lock_secret": "",
+                    "page_revision_id": ""
+                }
+            else:
+                status = "saved"
+                lock = _lock = await page_lock(url=url, pageid=pageid, forceedit=forceedit)
+
+            await page_save(
+                url=url, fullname=fullname, pageid=pageid, lock=_lock,
+                title=target.get("title", ""), content=target.get("content", ""), comment=target.get("comment", "")
+            )
+            _journal(key, "done")
+            return fullname, status, None
+
+        except asyncio.CancelledError:
+            if lock is not None:
+                await _unlock(fullname, pageid, lock)
+            raise
+        except exceptions.StatusIsNotOKError as e:
+            if lock is not None:
+                await _unlock(fullname, pageid, lock)
+            _journal(key, "failed", error=repr(e))
+            if e.args[1] == "page_locked":
+                logger.warning(f"EditMass | {fullname} is locked")
+                return fullname, "locked", e
+            logger.error(f"EditMass | failed to edit {fullname}", exc_info=True)
+            return fullname, "failed", e
+        except Exception as e:
+            if lock is not None:
+                await _unlock(fullname, pageid, lock)
+            _journal(key, "failed", error=repr(e))
+            logger.error(f"EditMass | failed to edit {fullname}", exc_info=True)
+            return fullname, "failed", e
+
+    return await scheduler.runpool(_innerfunc, targets, limit=limit)
 
 
 # --------------------
@@ -1204,7 +1443,7 @@ async def page_setparent(*, url: str, pageid: int, parentpage: str) -> bool:
 
 
 @decorator.require_session
-async def page_setparent_mass(*, limit: int = 10, url: str, targets: Union[list, tuple]) -> List[bool]:
+async def page_setparent_mass(*, limit: int = 10, url: str, targets: Union[list, tuple], journalpath: Optional[str] = None) -> List[Tuple[int, str, bool]]:
     """|AMC| |Coroutine| |SessionRequired| set parent page
 
     Arguments:
@@ -1216,34 +1455,44 @@ async def page_setparent_mass(*, limit: int = 10, url: str, targets: Union[list,
         targets: Union[list, tuple]
             list of target page's id and parentpage's fullname
             [(target_id, parent_fullname), ......]
+        journalpath: Optional[str], by default None
+            journal file path (see wikidot.journal)
+            if given, each operation is recorded, and operations already done in the journal are skipped.
 
     Raises:
         None
 
     Returns:
-        bool:
+        list:
+            [(target_id, parent_fullname, bool), ......]
             Whether the parent page setting was successful
             when failed, returns False
     """
-    sema = asyncio.Semaphore(limit)
-
-    async def _innerfunc(**kwargs):
-        async with sema:
-            try:
-                _r = await page_setparent(**kwargs)
-                return _r
-            except Exception:
-                logger.error(
-                    f"{kwargs['pageid']} - failed to set the parent page.",
-                    exc_info=True
-                )
-                return False
-
-    stmt = []
-    for t, parentpage in targets:
-        stmt.append(_innerfunc(url=url, parentpage=parentpage, pageid=t))
+    _done = journal.done(path=journalpath) if journalpath is not None else set()
+
+    async def _innerfunc(target):
+        pageid, parentpage = target
+        key = journal.makekey("setparent", cache.site(url), pageid, parentpage)
+        if key in _done:
+            return (pageid, parentpage, True)
+        if journalpath is not None:
+            journal.write(path=journalpath, key=key, state="intent", action="setparent", target=[pageid, parentpage])
+        try:
+            _r = await page_setparent(url=url, pageid=pageid, parentpage=parentpage)
+        except Exception as e:
+            logger.error(
+                f"{pageid} - failed to set the parent page.",
+                exc_info=True
+            )
+            _r = False
+            if journalpath is not None:
+                journal.write(path=journalpath, key=key, state="failed", error=repr(e))
+        else:
+            if journalpath is not None:
+                journal.write(path=journalpath, key=key, state="done")
+        return (pageid, parentpage, _r)
 
-    await asyncio.gather(*stmt)
+    return await scheduler.runpool(_innerfunc, targets, limit=limit)
 
 
 # --------------------
@@ -1264,6 +1513,10 @@ async def page_rename(*, url: str, pageid: int, fullname: str):
                 "new_name": fullname
             }
         )
+        _cache = cache.pageid.setdefault(cache.site(url), {})
+        for _fullname in [_f for _f, _id in _cache.items() if _id == pageid]:
+            del _cache[_fullname]
+        _cache[fullname] = pageid
         return True
     except exceptions.StatusIsNotOKError as e:
         if e.args[1] == "page_exists":
@@ -1274,28 +1527,45 @@ async def page_rename(*, url: str, pageid: int, fullname: str):
 
 
 @decorator.require_session
-async def page_rename_mass(*, limit: int = 10, url: str, targets: list):
-    sema = asyncio.Semaphore(limit)
+async def page_rename_mass(*, limit: int = 10, url: str, targets: list, journalpath: Optional[str] = None) -> List[Tuple[int, str, bool]]:
+    """|AMC| |Coroutine| |SessionRequired| Rename multiple pages
 
-    async def _innerfunc(**kwargs):
-        async with sema:
-            try:
-                status = await page_rename(**kwargs)
-            except Exception:
-                status = False
-            return (kwargs["pageid"], kwargs["fullname"], status)
-
-    stmt = []
-    for t in targets:
-        stmt.append(
-            _innerfunc(**{
-                "url": url,
-                "pageid": t[0],
-                "fullname": t[1]
-            })
-        )
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        targets: list
+            [(pageid, new_fullname), ......]
+        journalpath: Optional[str], by default None
+            journal file path (see wikidot.journal)
+            if given, each operation is recorded, and operations already done in the journal are skipped.
+
+    Returns:
+        list
+            [(pageid, new_fullname, bool), ......]
+    """
+    _done = journal.done(path=journalpath) if journalpath is not None else set()
+
+    async def _innerfunc(target):
+        pageid, fullname = target[0], target[1]
+        key = journal.makekey("rename", cache.site(url), pageid, fullname)
+        if key in _done:
+            return (pageid, fullname, True)
+        if journalpath is not None:
+            journal.write(path=journalpath, key=key, state="intent", action="rename", target=[pageid, fullname])
+        try:
+            status = await page_rename(url=url, pageid=pageid, fullname=fullname)
+        except Exception as e:
+            status = False
+            if journalpath is not None:
+                journal.write(path=journalpath, key=key, state="failed", error=repr(e))
+        else:
+            if journalpath is not None:
+                journal.write(path=journalpath, key=key, state="done")
+        return (pageid, fullname, status)
 
-    await asyncio.gather(*stmt)
+    return await scheduler.runpool(_innerfunc, targets, limit=limit)
 
 
 # --------------------
@@ -1345,73 +1615,158 @@ async def tag_set(*, url: str, pageid: int, tags: Union[list, tuple]) -> bool:
     return r
 
 
-@decorator.require_session
-async def tag_replace(*, limit: int = 10, url: str, before: str, after: str, selector: Optional[dict] = None) -> List[bool]:
-    """|AMC| |Coroutine| Replaces the tag on the page that matches the selector
+def tag_apply(tags: Union[list, tuple], rule: dict) -> List[str]:
+    """Apply a tag rule to tags without mutating them
 
     Arguments:
-        limit: int, by default 10
-            semaphore value = number of parallel executions
-        url: str
-            target site url
-            eg: "scp-jp.wikidot.com", "scpwiki.com"
-        before: str
-            tag you want to replace
-        after: str
-            tag after replacement
-        selector: Optional[dict]
-            custom getdata's arguments.
-            if None, use {"tags": +[before]} automatically.
+        tags: Union[list, tuple]
+            current tags
+        rule: dict
+            {"set": [...], "replace": {before: after}, "remove": [...], "add": [...]}
+            every key is optional, and they are applied in this order.
 
     Returns:
-        list[bool]:
-            list of action result
-
+        list[str]
+            tags after the rule
     """
+    _tags = list(rule["set"]) if "set" in rule else list(tags)
+    for before, after in rule.get("replace", {}).items():
+        if before in _tags:
+            _tags = [after if tag == before else tag for tag in _tags]
+    _tags = [tag for tag in _tags if tag not in rule.get("remove", ())]
+    for tag in rule.get("add", ()):
+        if tag not in _tags:
+            _tags.append(tag)
+    # remove duplicates keeping order
+    return list(dict.fromkeys(_tags))
 
-    if selector is None or "tags" not in selector:
-        if selector is None:
-            selector = {}
-        selector["tags"] = "+" + before
-
-    _r = await page_getdata_mass(limit=limit, url=url, module_body=["fullname", "tags", "_tags"], **selector)
-
-    targets = {t["fullname"]: [t["tags"] + t["_tags"], None]
-               for t in _r.values()}
 
-    ids = await page_getid_mass(limit=limit, url=url, targets=[t for t in targets])
+async def tag_reconcile(*, limit: int = 10, url: str, rules: List[dict], dryrun: bool = False, journalpath: Optional[str] = None) -> List[dict]:
+    """|AMC| |Coroutine| Make tags of pages match the rules, saving only pages that change
 
-    for fullname, pageid in ids:
-        targets[fullname][1] = pageid
-
-    sema = asyncio.Semaphore(limit)
+    Session is required unless dryrun is True.
 
-    async def _innerfunc(tags, pageid):
-        async with sema:
-            if before in tags:
-                tags.remove(before)
-            tags.append(after)
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        rules: list[dict]
+            desired state, applied in order
+            [{"selector": {ListPages arguments}, "set": [...], "replace": {before: after}, "remove": [...], "add": [...]}, ...]
+            eg: [{"selector": {"tags": "+tale"}, "replace": {"tale": "tale-jp"}}]
+        dryrun: bool, by default False
+            if True, only the report is returned and nothing is saved (session is not required)
+        journalpath: Optional[str], by default None
+            journal file path (see wikidot.journal)
+            if given, each saveTags is recorded, and operations already done in the journal are skipped.
+
+    Returns:
+        list[dict]
+            report of pages whose tags change
+            [{"fullname": str, "pageid": Optional[int], "before": [...], "after": [...], "result": Optional[bool]}, ...]
+            "result" is True if saved (or done in the journal), False if failed, None in dryrun.
+    """
+    """
+    MEMO:
+        1. selectorが同じルールをまとめ、selectorごとにListPagesを1周してtags/_tagsを取得
+        2. ページごとにルールを順に適用して差分を計算
+        3. 差分があるページのみpageidを解決してsaveTags
+    """
+    # ListPages sweep per distinct selector
+    _selectors = []
+    for rule in rules:
+        selector = dict(rule.get("selector") or {})
+        if selector not in _selectors:
+            _selectors.append(selector)
+
+    _sweeps = await asyncio.gather(*[
+        page_getdata_mass(limit=limit, url=url, module_body=["fullname", "tags", "_tags"], **selector)
+        for selector in _selectors
+    ])
+
+    current = {}
+    matched = []
+    for _r in _sweeps:
+        _r = _r or {}
+        for fullname, page in _r.items():
+            current[fullname] = page["tags"] + page["_tags"]
+        matched.append(set(_r))
+
+    # diff
+    desired = {fullname: list(tags) for fullname, tags in current.items()}
+    for rule in rules:
+        for fullname in matched[_selectors.index(dict(rule.get("selector") or {}))]:
+            desired[fullname] = tag_apply(desired[fullname], rule)
+
+    report = [
+        {"fullname": fullname, "pageid": None, "before": current[fullname], "after": desired[fullname], "result": None}
+        for fullname in current
+        if set(desired[fullname]) != set(current[fullname])
+    ]
+
+    logger.info(
+        f"TagReconcile | {url} | matched: {len(current)}, changes: {len(report)}, dryrun: {dryrun}"
+    )
+
+    if dryrun or not report:
+        return report
+
+    return await _tag_reconcile_apply(limit=limit, url=url, report=report, journalpath=journalpath)
+
+
+@decorator.require_session
+async def _tag_reconcile_apply(*, limit: int, url: str, report: List[dict], journalpath: Optional[str] = None) -> List[dict]:
+    _done = journal.done(path=journalpath) if journalpath is not None else set()
+
+    async def _innerfunc(_r: dict):
+        key = journal.makekey("tags", cache.site(url), _r["fullname"], sorted(_r["after"]))
+        if key in _done:
+            _r["result"] = True
+            return
+        # cached ids are not trusted for writes (the page may have been renamed or recreated)
+        _r["pageid"] = await page_getid(url=url, fullname=_r["fullname"], refresh=True)
+        if _r["pageid"] is None:
+            logger.error(f"TagSet | {_r['fullname']} is not found.")
+            _r["result"] = False
+            return
+        if journalpath is not None:
+            journal.write(path=journalpath, key=key, state="intent", action="tags", target=_r["fullname"], tags=_r["after"])
+        try:
             try:
-                return await tag_set(url=url, pageid=pageid, tags=tags)
-            except Exception:
-                logger.error(
-                    "TagSet | failed to set tags."
-                )
-                logger.debug(
-                    " ",
-                    exc_info=True
-                )
-                return False
+                await tag_set(url=url, pageid=_r["pageid"], tags=_r["after"])
+            except exceptions.StatusIsNotOKError as e:
+                if e.args[1] != "no_page":
+                    raise
+                # page was deleted and recreated after the id was resolved
+                _r["pageid"] = await page_getid(url=url, fullname=_r["fullname"], refresh=True)
+                if _r["pageid"] is None:
+                    raise
+                await tag_set(url=url, pageid=_r["pageid"], tags=_r["after"])
+        except Exception as e:
+            logger.error(
+                "TagSet | failed to set tags."
+            )
+            logger.debug(
+                " ",
+                exc_info=True
+            )
+            _r["result"] = False
+            if journalpath is not None:
+                journal.write(path=journalpath, key=key, state="failed", error=repr(e))
+        else:
+            _r["result"] = True
+            if journalpath is not None:
+                journal.write(path=journalpath, key=key, state="done")
 
-    stmt = []
-    for tags, pageid in targets.values():
-        stmt.append(_innerfunc(tags, pageid))
+    await scheduler.runpool(_innerfunc, report, limit=limit, ordered=False)
 
-    return await asyncio.gather(*stmt)
+    return report
 
 
 @decorator.require_session
-async def tag_reset(*, limit: int = 10, url: str, tagset: Union[list, tuple], selector: dict) -> List[bool]:
+async def tag_replace(*, limit: int = 10, url: str, before: str, after: str, selector: Optional[dict] = None,
+                      journalpath: Optional[str] = None) -> List[Tuple[str, bool]]:
     """|AMC| |Coroutine| Replaces the tag on the page that matches the selector
 
     Arguments:
@@ -1420,43 +1775,56 @@ async def tag_reset(*, limit: int = 10, url: str, tagset: Union[list, tuple], se
         url: str
             target site url
             eg: "scp-jp.wikidot.com", "scpwiki.com"
-        tagset: list
-            tags you want to set
-        selector: dict
+        before: str
+            tag you want to replace
+        after: str
+            tag after replacement
+        selector: Optional[dict]
             custom getdata's arguments.
+            if None, use {"tags": +[before]} automatically.
 
     Returns:
-        list[bool]:
-            list of action result
+        list:
+            [(fullname, True if saved or False if failed), ...]
+            pages without change are not saved and not included.
 
     """
 
-    _r = await page_getdata_mass(limit=limit, url=url, module_body=["fullname"], **selector)
+    selector = dict(selector) if selector is not None else {}
+    if "tags" not in selector:
+        selector["tags"] = "+" + before
 
-    targets_fullname = [t for t in _r]
+    report = await tag_reconcile(limit=limit, url=url, rules=[{"selector": selector, "replace": {before: after}}], journalpath=journalpath)
 
-    ids = await page_getid_mass(limit=limit, url=url, targets=targets_fullname)
+    return [(_r["fullname"], _r["result"]) for _r in report]
 
-    targets_ids = [t[1] for t in ids]
 
-    sema = asyncio.Semaphore(limit)
+@decorator.require_session
+async def tag_reset(*, limit: int = 10, url: str, tagset: Union[list, tuple], selector: dict,
+                    journalpath: Optional[str] = None) -> List[Tuple[str, bool]]:
+    """|AMC| |Coroutine| Replaces the tag on the page that matches the selector
 
-    async def _innerfunc(pageid):
-        async with sema:
-            try:
-                return await tag_set(url=url, pageid=pageid, tags=tagset)
-            except Exception:
-                logger.error(
-                    "Failed to set tag.",
-                    exc_info=True
-                )
-                return False
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+            eg: "scp-jp.wikidot.com", "scpwiki.com"
+        tagset: list
+            tags you want to set
+        selector: dict
+            custom getdata's arguments.
+
+    Returns:
+        list:
+            [(fullname, True if saved or False if failed), ...]
+            pages which already have exactly tagset are not saved and not included.
+
+    """
 
-    stmt = []
-    for pageid in targets_ids:
-        stmt.append(_innerfunc(pageid))
+    report = await tag_reconcile(limit=limit, url=url, rules=[{"selector": selector, "set": list(tagset)}], journalpath=journalpath)
 
-    return await asyncio.gather(*stmt)
+    return [(_r["fullname"], _r["result"]) for _r in report]
 
 
 # --------------------
@@ -1504,7 +1872,8 @@ async def forum_getcategories(*, url: str, includehidden: bool = True) -> List[T
     return result
 
 
-async def forum_getthreads_percategory(*, limit: int = 10, url: str, categoryid: int) -> dict:
+async def forum_getthreads_percategory(*, limit: int = 10, url: str, categoryid: int, sema: Optional[asyncio.Semaphore] = None,
+                                      cursor: Optional[dict] = None, attempt_count: int = 5, backoff: float = 5.0) -> dict:
     """|Coroutine| get all threads data in specific category
 
     Arguments:
@@ -1514,6 +1883,23 @@ async def forum_getthreads_percategory(*, limit: int = 10, url: str, categoryid:
             target site url
         categoryid: int
             target forum category id
+        sema: Optional[asyncio.Semaphore], by default None
+            semaphore shared with other calls
+            if given, every request is also counted against it.
+        cursor: Optional[dict], by default None
+            resumable progress, updated in place
+            {"total": number of pages(int), "pages": {page: threads(dict)}, "failed": [page, ...]}
+            Pages already in cursor are not requested again.
+            if given, pages which failed after all attempts are recorded in "failed"
+            and partial result is returned instead of raising.
+        attempt_count: int, by default 5
+            How many times to request each page
+        backoff: float, by default 5.0
+            seconds to wait before the first retry, doubled on each retry
+
+    Raises:
+        wikidot.exceptions.AMCRequestError
+            some page failed after all attempts (only when cursor is None)
 
     Returns:
         dict
@@ -1574,59 +1960,156 @@ async def forum_getthreads_percategory(*, limit: int = 10, url: str, categoryid:
 
         return num_pages, result
 
-    async def _getlastpage(*, limit: int, url: str, categoryid: int, totalpages: int):
-
+    if sema is None:
         sema = asyncio.Semaphore(limit)
 
-        async def __innerfunc(url: str, page: int):
-            async with sema:
-                _r = await _getthreadsspecificpage(url=url, page=page, categoryid=categoryid)
-                return _r[1]
-
-        stmt = []
-        for i in range(2, totalpages + 1):
-            stmt.append(__innerfunc(url=url, page=i))
+    async def _getpage(page: int):
+        cnt = 1
+        while True:
+            try:
+                async with sema:
+                    return await _getthreadsspecificpage(url=url, categoryid=categoryid, page=page)
+            except exceptions.DeadlineExceededError:
+                raise
+            except Exception:
+                if cnt < attempt_count:
+                    _wait = backoff * 2 ** (cnt - 1)
+                    logger.warning(
+                        f"GetThreadsPerCategory | failed, try again after {_wait}sec | category: {categoryid}, page: {page}"
+                    )
+                    cnt += 1
+                    await scheduler.sleep(_wait)
+                else:
+                    raise
 
-        return await asyncio.gather(*stmt)
+    _raise = cursor is None
+    if cursor is None:
+        cursor = {}
+    pages = cursor.setdefault("pages", {})
+    cursor["failed"] = []
 
-    cnt = 1
-    while True:
+    if 1 not in pages:
         try:
-            totalpages, _r = await _getthreadsspecificpage(url=url, categoryid=categoryid, page=1)
+            cursor["total"], pages[1] = await _getpage(1)
+        except Exception:
+            if _raise:
+                raise
+            logger.error(f"GetThreadsPerCategory | gave up | category: {categoryid}, page: 1")
+            cursor["failed"].append(1)
+            return {}
 
-            if totalpages > 1:
-                _rs = await _getlastpage(limit=limit, url=url, categoryid=categoryid, totalpages=totalpages)
+    async def _innerfunc(page: int):
+        return page, await _getpage(page)
 
-                for _rr in _rs:
-                    _r.update(_rr)
+    _pages = [page for page in range(2, cursor["total"] + 1) if page not in pages]
+    _errors = None if _raise else []
+    _rs = await scheduler.runpool(_innerfunc, _pages, limit=limit, errors=_errors)
+    if _raise and len(_rs) < len(_pages):
+        # cut off by the deadline
+        scheduler.checkdeadline()
 
-            return _r
-        except Exception:
-            if cnt < 5:
-                logger.warning("GetThreadsPerCategory | failed")
-                cnt += 1
-                asyncio.sleep(10)
-                pass
-            else:
-                raise
+    for page, _rr in _rs:
+        pages[page] = _rr[1]
+
+    for _e in _errors or []:
+        logger.error(f"GetThreadsPerCategory | gave up | category: {categoryid}, page: {_e.target}")
+        cursor["failed"].append(_e.target)
 
+    _r = {}
+    for page in sorted(pages):
+        _r.update(pages[page])
 
-async def forum_getthreads_mass(*, limit: int = 10, url: str, includehidden: bool = True) -> List[dict]:
+    return _r
 
-    _cats = await forum_getcategories(url=url, includehidden=includehidden)
 
-    _r = []
+async def forum_iterthreads(*, limit: int = 10, url: str, includehidden: bool = True, categories: Optional[List[Tuple[int, str]]] = None,
+                            sema: Optional[asyncio.Semaphore] = None, errors: Optional[list] = None):
+    """|Coroutine| |AsyncGenerator| Get all threads on the site, category by category as they complete
 
-    for _cat in _cats:
-        _catid, _cattitle = _cat
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+            shared by all categories and their pages
+        url: str
+            target site url
+        includehidden: bool, by default True
+            Whether to get hidden categories
+        categories: Optional[list[tuple[int, str]]], by default None
+            forum_getcategories's value
+            if None, get automatically.
+        sema: Optional[asyncio.Semaphore], by default None
+            semaphore shared with other calls
+            if given, limit is ignored.
+        errors: Optional[list], by default None
+            if given, failed categories are appended as wikidot.scheduler.MassError (target is (category_id, category_title))
+            and the other categories are yielded. (retry with categories=[e.target for e in errors])
+
+    Yields:
+        dict
+            {
+                "category_id": category id(int),
+                "category_title": category title(str),
+                "category_threads": forum_getthreads_percategory's value
+            }
+    """
+    """
+    MEMO:
+        ・全カテゴリのforum_getthreads_percategoryを同時にスケジュールし、1つのSemaphoreを共有させる
+        ・完了したカテゴリから順にyieldする
+    """
 
-        _ths = await forum_getthreads_percategory(limit=limit, url=url, categoryid=_catid)
+    if categories is None:
+        categories = await forum_getcategories(url=url, includehidden=includehidden)
 
-        _r.append({
-            "category_id": _catid,
-            "category_title": _cattitle,
+    if sema is None:
+        sema = asyncio.Semaphore(limit)
+
+    async def _innerfunc(category: Tuple[int, str]):
+        catid, cattitle = category
+        _ths = await forum_getthreads_percategory(url=url, categoryid=catid, sema=sema)
+        return {
+            "category_id": catid,
+            "category_title": cattitle,
             "category_threads": _ths
-        })
+        }
+
+    # one worker per category, requests are limited by sema
+    async for _r in scheduler.workerpool(_innerfunc, categories, limit=len(categories), errors=errors):
+        yield _r
+
+
+async def forum_getthreads_mass(*, limit: int = 10, url: str, includehidden: bool = True,
+                                categories: Optional[List[Tuple[int, str]]] = None, errors: Optional[list] = None) -> List[dict]:
+    """|AMC| |Coroutine| Get all threads on the site
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        includehidden: bool, by default True
+            Whether to get hidden categories
+        categories: Optional[list[tuple[int, str]]], by default None
+            forum_getcategories's value
+            if None, get automatically.
+        errors: Optional[list], by default None
+            if given, failed categories are appended as wikidot.scheduler.MassError (target is (category_id, category_title))
+            and the other categories are returned. (retry with categories=[e.target for e in errors])
+
+    Returns:
+        list
+            [forum_iterthreads's value, ....] in the order of categories
+    """
+
+    if categories is None:
+        categories = await forum_getcategories(url=url, includehidden=includehidden)
+    _cats = categories
+
+    _r = [_cat async for _cat in forum_iterthreads(limit=limit, url=url, categories=_cats, errors=errors)]
+
+    # keep the order of categories
+    _order = {catid: i for i, (catid, _) in enumerate(_cats)}
+    _r.sort(key=lambda _cat: _order[_cat["category_id"]])
 
     return _r
 
@@ -1681,14 +2164,11 @@ async def forum_getposts(*, url: str, threadid: int, page: int):
     _r_body = bs4(_r["body"], 'lxml')
 
     # pager
-    if page == 1:
-        pager = _r_body.find("div", class_="pager")
-        if pager is not None:
-            total = int(pager.find_all("span", class_="target")[-2].string)
-        else:
-            total = 1
+    pager = _r_body.find("div", class_="pager")
+    if pager is not None:
+        total = pager_parser(pager)
     else:
-        total = None
+        total = 1
 
     posts = _r_body.find_all("div", class_="post", recursive=True)
 
@@ -1704,105 +2184,429 @@ async def forum_getposts(*, url: str, threadid: int, page: int):
     return total, r
 
 
-async def forum_getposts_perthread(*, limit: int = 10, url: str, threadid: int):
+async def forum_getposts_perthread(*, limit: int = 10, url: str, threadid: int, sema: Optional[asyncio.Semaphore] = None,
+                                   errors: Optional[list] = None):
+    """|AMC| |Coroutine| Get all posts in the thread
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        threadid: int
+            target thread id
+        sema: Optional[asyncio.Semaphore], by default None
+            semaphore shared with the caller
+        errors: Optional[list], by default None
+            if given, failed pages are appended as wikidot.scheduler.MassError
+            (target is (threadid, page), page is None when the first page failed and the whole thread is missing)
+            and posts of the other pages are returned. (retry with forum_getposts_pages(targets=[e.target for e in errors]))
 
-    total, r = await forum_getposts(url=url, threadid=threadid, page=1)
+    Returns:
+        Optional[list]
+            posts of the thread
+            None if the first page failed (only when errors is given)
+    """
 
-    async def _getallpage():
+    if sema is None:
         sema = asyncio.Semaphore(limit)
 
-        async def __innerfunc(page):
-            async with sema:
-                _r = await forum_getposts(url=url, threadid=threadid, page=page)
-                return _r[1]
-
-        stmt = []
-        for i in range(2, total + 1):
-            stmt.append(__innerfunc(page=i))
+    async def _getpage(target: Tuple[int, Optional[int]]):
+        _, page = target
+        async with sema:
+            return await forum_getposts(url=url, threadid=threadid, page=1 if page is None else page)
 
-        return await asyncio.gather(*stmt)
+    _first = await scheduler.runpool(_getpage, [(threadid, None)], limit=1, errors=errors)
+    if not _first:
+        if errors is None:
+            # the first page was cut off by the deadline
+            scheduler.checkdeadline()
+        return None
+    total, r = _first[0]
 
-    _r = await _getallpage()
+    _r = await scheduler.runpool(_getpage, [(threadid, page) for page in range(2, total + 1)], limit=limit, errors=errors)
 
-    for _rr in _r:
+    for _, _rr in _r:
         r.extend(_rr)
 
     return r
 
 
+async def forum_getposts_pages(*, limit: int = 10, url: str, targets: List[Tuple[int, Optional[int]]],
+                               errors: Optional[list] = None) -> List[Tuple[int, Optional[int], list]]:
+    """|AMC| |Coroutine| Get posts of specific pages of threads
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        targets: list[tuple[int, Optional[int]]]
+            [(threadid, page), ....]
+            page None means all pages of the thread.
+            MassError.target of forum_getposts_perthread / forum_iterposts can be passed as it is.
+        errors: Optional[list], by default None
+            if given, failed targets are appended as wikidot.scheduler.MassError (target is (threadid, page))
+            and the other targets are returned.
+
+    Returns:
+        list
+            [(threadid, page, posts), ....]
+    """
+
+    sema = asyncio.Semaphore(limit)
+
+    async def _innerfunc(target: Tuple[int, Optional[int]]):
+        threadid, page = target
+        if page is None:
+            return threadid, page, await forum_getposts_perthread(url=url, threadid=threadid, sema=sema, errors=errors)
+        async with sema:
+            _r = await forum_getposts(url=url, threadid=threadid, page=page)
+        return threadid, page, _r[1]
+
+    _r = await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
+
+    # whole threads whose first page failed are already recorded in errors
+    return [_rr for _rr in _r if _rr[2] is not None]
+
+
+async def forum_iterposts(*, limit: int = 10, url: str, includehidden: bool = True,
+                          categories: Optional[List[Tuple[int, str]]] = None, errors: Optional[list] = None):
+    """|AMC| |Coroutine| |AsyncGenerator| Get all posts on the site, thread by thread as they complete
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+            shared by category listing, thread listing and post fetching
+        url: str
+            target site url
+        includehidden: bool, by default True
+            Whether to get hidden categories
+        categories: Optional[list[tuple[int, str]]], by default None
+            forum_getcategories's value
+            if None, get automatically.
+        errors: Optional[list], by default None
+            if given, failures are appended as wikidot.scheduler.MassError and the rest is yielded.
+            target is (category_id, category_title) for categories -> retry with categories=[...]
+            target is (threadid, page) for posts -> retry with forum_getposts_pages(targets=[...])
+            (category_title is str, page is int or None)
+
+    Yields:
+        tuple[int, int, list]
+            (category_id, threadid, forum_getposts_perthread's value)
+    """
+    """
+    MEMO:
+        ・カテゴリ列挙 -> スレッド列挙 -> ポスト取得 をパイプライン化
+            -> 完了したカテゴリのスレッドをworkerpoolに流し、スレッド一覧の取得中もポスト取得を進める
+        ・ワーカー数・リクエスト数ともに1つのlimitで制限する(タスクはスレッド数ではなくlimit個)
+    """
+    sema = asyncio.Semaphore(limit)
+
+    async def _threads():
+        async for _cat in forum_iterthreads(url=url, includehidden=includehidden, categories=categories, sema=sema, errors=errors):
+            for threadid in _cat["category_threads"]:
+                yield _cat["category_id"], threadid
+
+    async def _innerfunc(target: Tuple[int, int]):
+        catid, threadid = target
+        return catid, threadid, await forum_getposts_perthread(url=url, threadid=threadid, sema=sema, errors=errors)
+
+    # page failures are recorded by forum_getposts_perthread as (threadid, page)
+    async for _r in scheduler.workerpool(_innerfunc, _threads(), limit=limit):
+        if _r[2] is not None:
+            yield _r
+
+
+async def forum_getposts_mass(*, limit: int = 10, url: str, includehidden: bool = True,
+                              categories: Optional[List[Tuple[int, str]]] = None, errors: Optional[list] = None) -> List[Tuple[int, list]]:
+    """|AMC| |Coroutine| Get all posts on the site
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        includehidden: bool, by default True
+            Whether to get hidden categories
+        categories: Optional[list[tuple[int, str]]], by default None
+            forum_getcategories's value
+            if None, get automatically.
+        errors: Optional[list], by default None
+            see forum_iterposts
+
+    Returns:
+        list
+            [(threadid, forum_getposts_perthread's value), ....]
+    """
+    return [(threadid, _posts) async for _, threadid, _posts in forum_iterposts(
+        limit=limit, url=url, includehidden=includehidden, categories=categories, errors=errors
+    )]
+
+
+async def forum_sync(*, limit: int = 10, url: str, store: dict, includehidden: bool = True) -> dict:
+    """|AMC| |Coroutine| Incrementally archive all forum posts on the site
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+            shared by thread listing and post fetching
+        url: str
+            target site url
+        store: dict
+            local archive, updated in place. Pass {} (or wikidot.cache.load()) for the first sync.
+            {
+                "threads": {
+                    threadid: {
+                        "category_id": int,
+                        "title": str,
+                        "posts": number of posts(int),
+                        "last_post_id": Optional[int],
+                        "pages": number of ForumViewThreadPostsModule pages(int)
+                    }
+                },
+                "posts": {threadid: {postid: forum_getposts's post dict}}
+            }
+        includehidden: bool, by default True
+            Whether to get hidden categories
+
+    Raises:
+        wikidot.exceptions.DeadlineExceededError(msg, reason)
+            the deadline of wikidot.scheduler.deadlinecontext() passed before the sweep finished.
+            store is left unchanged.
+
+    Returns:
+        dict
+            {threadid: number of new posts(int)} of threads which were fetched
+    """
+    """
+    MEMO:
+        1. forum_iterthreadsで全スレッドのposts数を取得
+        2. posts数が変わっていないスレッドはスキップ
+        3. 変わったスレッドは、前回の最終ページから末尾までのみ取得
+        4. マージ後の件数が足りなければ(途中のページに返信が付いた・削除されたなど)全ページを取得し直す
+    """
+    threads = store.setdefault("threads", {})
+    posts = store.setdefault("posts", {})
+
+    sema = asyncio.Semaphore(limit)
+
+    async def _getpage(threadid: int, page: int):
+        async with sema:
+            return await forum_getposts(url=url, threadid=threadid, page=page)
+
+    async def _getpages(threadid: int, pages: List[int]):
+        _rs = await scheduler.runpool(lambda page: _getpage(threadid, page), pages, limit=limit)
+        _posts = {}
+        for _, _r in _rs:
+            _posts.update({post["id"]: post for post in _r})
+        return _posts
+
+    async def _sync(threadid: int, count: int):
+        known = posts.get(threadid, {})
+        start = threads[threadid]["pages"] if threadid in threads else 1
+
+        total, _r = await _getpage(threadid, start)
+        # pages before start are kept from the archive
+        _posts = dict(known) if start > 1 else {}
+        _posts.update({post["id"]: post for post in _r})
+        if total > start:
+            _posts.update(await _getpages(threadid, list(range(start + 1, total + 1))))
+
+        if start > 1 and len(_posts) != count:
+            # replies were added on earlier pages, or posts were deleted
+            _posts = await _getpages(threadid, list(range(1, total + 1)))
+
+        return total, _posts
+
+    listed = {}
+
+    async def _changed():
+        async for _cat in forum_iterthreads(url=url, includehidden=includehidden, sema=sema):
+            for threadid, thread in _cat["category_threads"].items():
+                listed[threadid] = (_cat["category_id"], thread)
+                if threadid not in threads or threads[threadid]["posts"] != thread["posts"]:
+                    yield threadid, thread["posts"]
+
+    async def _innerfunc(target: Tuple[int, int]):
+        threadid, count = target
+        return (threadid, *await _sync(threadid, count))
+
+    _rs = await scheduler.runpool(_innerfunc, _changed(), limit=limit, ordered=False)
+    # the thread listing may be cut short by the deadline, which would delete unlisted threads
+    scheduler.checkdeadline()
+
+    r = {}
+    for threadid, total, _posts in _rs:
+        catid, thread = listed[threadid]
+        r[threadid] = len(_posts.keys() - posts.get(threadid, {}).keys())
+        posts[threadid] = _posts
+        threads[threadid] = {
+            "category_id": catid,
+            "title": thread["title"],
+            "posts": thread["posts"],
+            "last_post_id": max(_posts) if _posts else None,
+            "pages": total
+        }
+
+    # deleted threads
+    for threadid in list(threads):
+        if threadid not in listed:
+            del threads[threadid]
+            posts.pop(threadid, None)
+
+    logger.info(
+        f"ForumSync | {url} | threads: {len(listed)}, fetched: {len(r)}, new posts: {sum(r.values())}"
+    )
+
+    return r
+
+
 async def forum_getparentpagefullname(*, url: str, threadid: int, forumcategoryname: str = "forum"):
     async def _process(url, threadid, forumcategoryname):
-        async with httpx.AsyncClient() as client:
-            logger.debug(
-                f"Get parentpage: http://{url}/{forumcategoryname}/t-{threadid}"
-            )
-            _source = await client.get(
-                f"http://{url}/{forumcategoryname}/t-{threadid}",
-                timeout=60
-            )
+        logger.debug(
+            f"Get parentpage: http://{url}/{forumcategoryname}/t-{threadid}"
+        )
+        _source = await connector.get(
+            url=f"http://{url}/{forumcategoryname}/t-{threadid}",
+            timeout=60
+        )
 
-            # 404
-            if _source.status_code != 200:
-                raise exceptions.RequestFailedError(
-                    "Unexpected status code returns",
-                    _source.status_code
-                )
+        # 404
+        if _source.status_code != 200:
+            raise exceptions.RequestFailedError(
+                "Unexpected status code returns",
+                _source.status_code
+            )
 
+        # read only the link in #page-title instead of parsing whole document
+        fullname = re.search(r'<div id="page-title">\s*<a href="([^"]+)"', _source.text)
+        if fullname is not None:
+            fullname = fullname.group(1)
+        else:
             contents = bs4(_source.text, 'lxml')
             fullname = contents.find("div", id="page-title").find("a")["href"]
-            fullname = fullname.lstrip("/")
-            return fullname
+        fullname = fullname.lstrip("/")
+        return fullname
 
     cnt = 1
     while True:
         try:
             return await _process(url, threadid, forumcategoryname)
+        except exceptions.DeadlineExceededError:
+            raise
         except Exception:
             if cnt < 5:
                 cnt += 1
-                await asyncio.sleep(20)
+                await scheduler.sleep(20)
                 pass
             else:
                 raise
 
 
-
 async def forum_getparentpage(*, url: str, threadid: int, forumcategoryname: str = "forum"):
+    """|Coroutine| Get parent page of per-page discussion thread
+
+    Results are kept in wikidot.cache.threadparent, and the network is used only for unknown threads.
+    (save/load with wikidot.cache.save_lookups / load_lookups)
+
+    Returns:
+        tuple[str, Optional[int]]
+            (fullname, pageid)
+    """
+    _cache = cache.threadparent.setdefault(cache.site(url), {})
+    if threadid in _cache:
+        return _cache[threadid]
+
     fullname = await forum_getparentpagefullname(url=url, threadid=threadid, forumcategoryname=forumcategoryname)
     pageid = await page_getid(url=url, fullname=fullname)
+
+    if pageid is not None:
+        _cache[threadid] = (fullname, pageid)
+        cache.pagediscussion.setdefault(cache.site(url), {})[pageid] = threadid
+
     return (fullname, pageid)
 
 
-async def forum_getparentpage_mass(*, limit: int = 10, url: str, targets: list, forumcategoryname: str = "forum"):
-    sema = asyncio.Semaphore(limit)
+async def forum_getparentpage_mass(*, limit: int = 10, url: str, targets: list, forumcategoryname: str = "forum", errors: Optional[list] = None):
+    _cache = cache.threadparent.setdefault(cache.site(url), {})
 
-    async def _innerfunc(url: str, threadid: int, forumcategoryname: str):
-        async with sema:
-            fullname, pageid = await forum_getparentpage(url=url, threadid=threadid, forumcategoryname=forumcategoryname)
-            return (threadid, fullname, pageid)
+    async def _innerfunc(threadid: int):
+        if threadid in _cache:
+            return (threadid, *_cache[threadid])
+        fullname, pageid = await forum_getparentpage(url=url, threadid=threadid, forumcategoryname=forumcategoryname)
+        return (threadid, fullname, pageid)
 
-    stmt = []
-    for t in targets:
-        stmt.append(
-            _innerfunc(url=url, threadid=t, forumcategoryname=forumcategoryname)
-        )
+    return await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
 
-    return await asyncio.gather(*stmt)
 
+async def forum_getpagediscussion(*, url: str, pageid: int) -> Optional[int]:
+    """|AMC| |Coroutine| Get per-page discussion thread id of the page
+
+    Results are kept in wikidot.cache.pagediscussion.
+
+    Returns:
+        Optional[int]
+            thread id, or None if the page has no discussion thread yet
+    """
+    _cache = cache.pagediscussion.setdefault(cache.site(url), {})
+    if pageid in _cache:
+        return _cache[pageid]
 
-async def forum_getpagediscussion(*, url: str, pageid: int):
     _r = await connector.connect(
         url=url,
         body={
             "moduleName": "forum/ForumCommentsListModule",
             "pageId": pageid
-        }
+        },
+        unescape=False
     )
 
-    threadid = re.search(r"WIKIDOT\.forumThreadId = \d+;", _r["body"]).group()
-    threadid = re.search(r"\d+", threadid).group()
-
-    return int(threadid)
+    # scan for the marker instead of unescaping and matching the whole body
+    _body = _r["body"]
+    _pos = _body.find("WIKIDOT.forumThreadId = ")
+    if _pos == -1:
+        return None
+    threadid = re.match(r"\d+", _body[_pos + 24:_pos + 44])
+    if threadid is None:
+        return None
+
+    _cache[pageid] = int(threadid.group())
+
+    return _cache[pageid]
+
+
+async def forum_getpagediscussion_mass(*, limit: int = 10, url: str, targets: List[int], comments: Optional[dict] = None, errors: Optional[list] = None) -> List[Tuple[int, Optional[int]]]:
+    """|AMC| |Coroutine| Get per-page discussion thread ids of multiple pages
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        targets: list[int]
+            list of target pages' id
+        comments: Optional[dict], by default None
+            {pageid: number of comments}, eg: ListPages "comments" joined by pageid
+            pages with 0 comments have no thread yet, so they are not requested.
+        errors: Optional[list], by default None
+            if given, failed targets are appended as wikidot.scheduler.MassError
+            and only successful results are returned. (retry with [e.target for e in errors])
+
+    Returns:
+        list
+            [(pageid, Optional[threadid]), .....]
+    """
+    _cache = cache.pagediscussion.setdefault(cache.site(url), {})
+
+    async def _innerfunc(pageid: int):
+        if pageid in _cache:
+            return pageid, _cache[pageid]
+        if comments is not None and comments.get(pageid, 1) == 0:
+            return pageid, None
+        return pageid, await forum_getpagediscussion(url=url, pageid=pageid)
+
+    return await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
 
 
 @decorator.require_session
@@ -1854,22 +2658,12 @@ async def forum_edit(*, url: str, threadid: int, postid: int, title: str = "", c
 # --------------------
 
 
-async def rss_get(*, url: str, code: str):
-    r = []
-
-    # mode
-    if code == "posts":
-        mode = "p"
-    elif code == "threads":
-        mode = "t"
-    elif "ct" in code:
-        mode = "t"
-    else:
-        mode = "p"
-
-    feed = feedparser.parse(f"http://{url}/feed/forum/{code}.xml")
+def rss_parser(content: bytes, mode: str) -> list:
+    feed = feedparser.parse(content)
     entries = feed.entries
 
+    r = []
+
     for entry in reversed(entries):
         if mode == "t":
             link = entry.id
@@ -1892,9 +2686,10 @@ async def rss_get(*, url: str, code: str):
             })
         elif mode == "p":
             link = entry.id
+            # http://example.wikidot.com/forum/t-[thread_id]#post-[post_id]
             ids = link.split("/t-")[1].split("#post-")
-            entryid = int(ids[0])
-            threadid = int(ids[1])
+            threadid = int(ids[0])
+            postid = int(ids[1])
             title = entry.title
             pubdate = datetime.fromtimestamp(mktime(entry.published_parsed))
             username = entry.wikidot_authorname
@@ -1903,7 +2698,7 @@ async def rss_get(*, url: str, code: str):
 
             r.append({
                 "link": link,
-                "post_id": entryid,
+                "post_id": postid,
                 "thread_id": threadid,
                 "title": title,
                 "pubdate": pubdate,
@@ -1915,12 +2710,154 @@ async def rss_get(*, url: str, code: str):
     return r
 
 
+async def rss_get(*, url: str, code: str, state: Optional[dict] = None) -> list:
+    """|Coroutine| Get forum RSS feed
+
+    Arguments:
+        url: str
+            target site url
+        code: str
+            feed code
+            eg: "posts", "threads", "ct-[category_id]", "t-[thread_id]"
+        state: Optional[dict], by default None
+            polling state of the feed, updated in place
+            {"etag": str, "modified": str, "seen": set of post/thread ids}
+            if given, the feed is requested conditionally (304 returns []),
+            and entries seen on the previous poll are not returned again.
+
+    Returns:
+        list[dict]
+            entries, oldest first
+    """
+    """
+    MEMO:
+        ・取得は共有クライアント(connector.get)で非同期に行い、ETag/Last-Modifiedで条件付きリクエスト
+        ・feedparser/bs4によるパースはイベントループを止めないよう、executorで実行する
+    """
+
+    # mode
+    if code == "posts":
+        mode = "p"
+    elif code == "threads":
+        mode = "t"
+    elif "ct" in code:
+        mode = "t"
+    else:
+        mode = "p"
+
+    headers = {}
+    if state is not None:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
+
+    _r = await connector.get(url=f"{url}/feed/forum/{code}.xml", headers=headers)
+
+    if _r.status_code == 304:
+        logger.debug(f"RSS | {url} {code} | not modified")
+        return []
+    elif _r.status_code != 200:
+        raise exceptions.RequestFailedError(
+            "Status code is not 200.", _r.status_code
+        )
+
+    loop = asyncio.get_event_loop()
+    r = await loop.run_in_executor(None, rss_parser, _r.content, mode)
+
+    if state is not None:
+        state["etag"] = _r.headers.get("ETag")
+        state["modified"] = _r.headers.get("Last-Modified")
+        key = "post_id" if mode == "p" else "thread_id"
+        seen = state.get("seen", set())
+        # only ids in the current feed can appear again
+        state["seen"] = {entry[key] for entry in r}
+        r = [entry for entry in r if entry[key] not in seen]
+
+    return r
+
+
+async def rss_poll(*, feeds: list, states: Optional[dict] = None, subscribers: Optional[list] = None,
+                   limit: int = 10, interval: float = 60.0, jitter: float = 0.1, skipinitial: bool = True):
+    """|Coroutine| |AsyncGenerator| Poll many forum RSS feeds in one process
+
+    Arguments:
+        feeds: list
+            [(url, code), (url, code, interval), ...]
+            eg: [("scp-jp.wikidot.com", "posts"), ("scpwiki.com", "ct-12345", 30)]
+        states: Optional[dict], by default None
+            {(url, code): rss_get's state}
+            updated in place, so it can be stored and passed again to resume.
+        subscribers: Optional[list], by default None
+            callables (function or coroutine function) called with (url, code, entry) on each entry
+        limit: int, by default 10
+            number of feeds requested at the same time
+        interval: float, by default 60.0
+            poll interval (seconds) of feeds without their own interval
+        jitter: float, by default 0.1
+            ratio of random spread added to intervals, so that polls do not burst
+        skipinitial: bool, by default True
+            whether to skip entries of the first poll of feeds without state
+
+    Yields:
+        tuple[str, str, dict]
+            (url, code, rss_get's entry)
+    """
+    """
+    MEMO:
+        ・フィードごとにタスクを1つ持ち、interval±jitterでsleepしながらrss_get(state付き)を呼ぶ
+        ・接続はconnector.client()の共有プールを使う
+    """
+    if states is None:
+        states = {}
+    if subscribers is None:
+        subscribers = []
+
+    sema = asyncio.Semaphore(limit)
+    queue = asyncio.Queue()
+
+    async def _poll(url: str, code: str, _interval: float):
+        # spread the first polls
+        await asyncio.sleep(random.uniform(0, _interval * jitter))
+        while True:
+            _initial = (url, code) not in states
+            # the state is stored only after a successful poll, so that a failed first poll stays initial
+            state = {} if _initial else states[(url, code)]
+            try:
+                async with sema:
+                    entries = await rss_get(url=url, code=code, state=state)
+                states[(url, code)] = state
+                if not (_initial and skipinitial):
+                    for entry in entries:
+                        await queue.put((url, code, entry))
+            except Exception:
+                logger.warning(f"RSSPoll | failed to poll {url} {code}", exc_info=True)
+            await asyncio.sleep(_interval * random.uniform(1 - jitter, 1 + jitter))
+
+    tasks = []
+    for feed in feeds:
+        url, code = feed[0], feed[1]
+        tasks.append(asyncio.ensure_future(_poll(url, code, feed[2] if len(feed) > 2 else interval)))
+
+    try:
+        while True:
+            url, code, entry = await queue.get()
+            for subscriber in subscribers:
+                _r = subscriber(url, code, entry)
+                if asyncio.iscoroutine(_r):
+                    await _r
+            yield url, code, entry
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 # --------------------
 # User
 # --------------------
 
 
-async def site_getmembers(*, url: str, page: int):
+async def site_getmembers(*, url: str, page: int, order: str = ""):
 
     _r = await connector.connect(
         url=url,
@@ -1928,7 +2865,7 @@ async def site_getmembers(*, url: str, page: int):
             "moduleName": "membership/MembersListModule",
             "page": page,
             "group": "",
-            "order": "",
+            "order": order,
         }
     )
 
@@ -1957,27 +2894,108 @@ async def site_getmembers(*, url: str, page: int):
     return total, r
 
 
-async def site_getmembers_mass(*, limit: int = 10, url: str):
-    total, r = await site_getmembers(url=url, page=1)
+async def site_getmembers_mass(*, limit: int = 10, url: str, store: Optional[dict] = None, neworder: str = "dateJoined desc",
+                               pages: Optional[List[int]] = None, errors: Optional[list] = None):
+    """|AMC| |Coroutine| Get members of the site
 
-    async def _getallpage():
-        sema = asyncio.Semaphore(limit)
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        store: Optional[dict], by default None
+            local member index, updated in place (incremental mode)
+            {
+                "members": {user_id: (user_name, user_unix, user_id, joindate)},
+                "watermark": joindate of the newest known member(datetime)
+            }
+            if given and not empty, pages are requested from the newest side
+            and requesting stops at the first member who joined before the watermark.
+            Members who left and rejoined are returned again with the new joindate.
+            Membership can be checked with `user_id in store["members"]`.
+        neworder: str, by default "dateJoined desc"
+            MembersListModule "order" value listing members by join date, newest first (incremental mode)
+        pages: Optional[list[int]], by default None
+            if given, only these pages of the member list are requested.
+        errors: Optional[list], by default None
+            if given, failed pages are appended as wikidot.scheduler.MassError (target is the page number)
+            and members of the other pages are returned. (retry with pages=[e.target for e in errors])
+            In incremental mode, the scan stops at the failed page and store is not updated.
 
-        async def __innerfunc(page):
-            async with sema:
-                _r = await site_getmembers(url=url, page=page)
-                return _r[1]
+    Returns:
+        list
+            [(user_name, user_unix, user_id, joindate), ...]
+            all members, or only members who joined since the watermark in incremental mode
+    """
+    """
+    MEMO:
+        ・incrementalモード: 参加日時の新しい順(neworder)を指定して1ページ目から1ページずつ取得
+            -> watermarkより前に参加したメンバーに到達したら打ち切る
+                (再参加したメンバーは既知でも先頭に並ぶため、user_idでは打ち切らない)
+        ・退会したメンバーは差分では検出できないため、storeを空にして全件取得し直す
+    """
+    async def _getpage(page: int):
+        _r = await site_getmembers(url=url, page=page)
+        return _r[1]
+
+    if pages is not None:
+        r = []
+        for _rr in await scheduler.runpool(_getpage, pages, limit=limit, errors=errors):
+            r.extend(_rr)
+    elif store is not None and store.get("members"):
+        members = store["members"]
+        watermark = store.get("watermark")
+
+        new = []
+        page = 1
+        total = 1
+        while page <= total:
+            _rr = await scheduler.runpool(
+                lambda page: site_getmembers(url=url, page=page, order=neworder), [page], limit=1, errors=errors
+            )
+            if not _rr:
+                # members after the failed page are unknown, keep store as it is
+                return new
+            total, _r = _rr[0]
+
+            reached = False
+            for member in _r:
+                # stop on join date, not on user id: a member who left and rejoined is listed at the top again
+                if watermark is not None:
+                    if member[3] is not None and member[3] < watermark:
+                        reached = True
+                        break
+                elif member[2] in members:
+                    reached = True
+                    break
+                if member[2] in members and members[member[2]][3] == member[3]:
+                    # joined at the same time as the watermark and already known
+                    continue
+                new.append(member)
+            if reached:
+                break
+            page += 1
 
-        stmt = []
-        for i in range(2, total + 1):
-            stmt.append(__innerfunc(page=i))
+        r = new
+    else:
+        _first = await scheduler.runpool(lambda page: site_getmembers(url=url, page=page), [1], limit=1, errors=errors)
+        if not _first:
+            return []
+        total, r = _first[0]
 
-        return await asyncio.gather(*stmt)
+        _r = await scheduler.runpool(_getpage, range(2, total + 1), limit=limit, errors=errors)
 
-    _r = await _getallpage()
+        for _rr in _r:
+            r.extend(_rr)
 
-    for _rr in _r:
-        r.extend(_rr)
+    if store is not None:
+        members = store.setdefault("members", {})
+        for member in r:
+            if member[2] is not None:
+                members[member[2]] = member
+        _dates = [member[3] for member in members.values() if member[3] is not None]
+        if _dates:
+            store["watermark"] = max(_dates)
 
     return r
 
@@ -1987,7 +3005,7 @@ async def site_getmembers_mass(*, limit: int = 10, url: str):
 # --------------------
 
 
-async def vote_getvoter(*, url: str, pageid: int):
+async def vote_getvoter(*, url: str, pageid: int, strict: bool = False):
     try:
         _r = await connector.connect(
             url=url,
@@ -1998,6 +3016,9 @@ async def vote_getvoter(*, url: str, pageid: int):
         )
     except exceptions.StatusIsNotOKError as e:
         logger.error(f"Status is not OK, {e.args[1]}, {pageid}")
+        # "no voters" and "could not get voters" must not be mixed up by callers which compare snapshots
+        if strict:
+            raise
         return []
 
     _r = bs4(_r["body"], "lxml")
@@ -2020,19 +3041,274 @@ async def vote_getvoter(*, url: str, pageid: int):
     return r
 
 
-async def vote_getvoter_mass(*, limit: int = 10, url: str, targets: List[int]):
-    sema = asyncio.Semaphore(limit)
+async def vote_getvoter_mass(*, limit: int = 10, url: str, targets: List[int], errors: Optional[list] = None, strict: bool = False):
+    async def _innerfunc(pageid):
+        voters = await vote_getvoter(url=url, pageid=pageid, strict=strict)
+        return (pageid, voters)
 
-    async def _innerfunc(**kwargs):
-        async with sema:
-            voters = await vote_getvoter(**kwargs)
-            return (kwargs["pageid"], voters)
+    return await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
+
+
+def vote_buildmatrix(voters: List[Tuple[int, list]]) -> dict:
+    """Build sparse user x page vote matrix from vote_getvoter_mass's value
+
+    Arguments:
+        voters: list
+            [(pageid, [(user_name, user_unix, user_id, vote), ...]), ...]
+            voters without user id are ignored.
+
+    Returns:
+        dict
+            {
+                "users": array('i') user_id of each user index,
+                "pages": array('i') pageid of each page index,
+                "userindex": {user_id: user index},
+                "pageindex": {pageid: page index},
+                "row": array('i') user index of each vote (COO),
+                "col": array('i') page index of each vote (COO),
+                "data": array('b') vote value,
+                "indptr": array('i') votes of page index i are [indptr[i], indptr[i + 1]) (CSR by page)
+            }
+    """
+    users = array("i")
+    pages = array("i")
+    userindex = {}
+    pageindex = {}
+    row = array("i")
+    col = array("i")
+    data = array("b")
+    indptr = array("i", [0])
+
+    for pageid, _voters in voters:
+        if pageid in pageindex:
+            continue
+        pageindex[pageid] = len(pages)
+        pages.append(pageid)
+        for _, _, user_id, vote in _voters:
+            if user_id is None:
+                continue
+            if user_id not in userindex:
+                userindex[user_id] = len(users)
+                users.append(user_id)
+            row.append(userindex[user_id])
+            col.append(pageindex[pageid])
+            data.append(vote)
+        indptr.append(len(data))
+
+    return {
+        "users": users,
+        "pages": pages,
+        "userindex": userindex,
+        "pageindex": pageindex,
+        "row": row,
+        "col": col,
+        "data": data,
+        "indptr": indptr
+    }
+
+
+async def vote_getmatrix(*, limit: int = 10, url: str, targets: List[int]) -> dict:
+    """|AMC| |Coroutine| Get voters of multiple pages as sparse user x page matrix
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        targets: list[int]
+            list of target pages' id
+
+    Returns:
+        dict
+            vote_buildmatrix's value
+    """
+    return vote_buildmatrix(await vote_getvoter_mass(limit=limit, url=url, targets=targets))
+
+
+def vote_matrix_pagescore(matrix: dict) -> array:
+    """Sum of votes per page index"""
+    indptr, data = matrix["indptr"], matrix["data"]
+    return array("i", (sum(data[indptr[i]:indptr[i + 1]]) for i in range(len(matrix["pages"]))))
+
+
+def vote_matrix_useractivity(matrix: dict) -> Tuple[array, array]:
+    """Number of (up, down) votes per user index"""
+    up = array("i", bytes(4 * len(matrix["users"])))
+    down = array("i", bytes(4 * len(matrix["users"])))
+    for user, vote in zip(matrix["row"], matrix["data"]):
+        if vote > 0:
+            up[user] += 1
+        elif vote < 0:
+            down[user] += 1
+    return up, down
+
+
+def vote_matrix_similarity(matrix: dict, user_id: int, top: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Co-voting cosine similarity between the user and the other users
+
+    Arguments:
+        matrix: dict
+            vote_buildmatrix's value
+        user_id: int
+            target user id
+        top: Optional[int], by default None
+            number of results, or all users who voted on the same pages
+
+    Returns:
+        list
+            [(user_id, similarity), ...] sorted by similarity descending
+    """
+    users, row, col, data, indptr = matrix["users"], matrix["row"], matrix["col"], matrix["data"], matrix["indptr"]
+    target = matrix["userindex"].get(user_id)
+    if target is None:
+        return []
+
+    norm = [0] * len(users)
+    for user, vote in zip(row, data):
+        norm[user] += vote * vote
+
+    # walk only the pages the target voted on
+    dot = {}
+    for k in range(len(data)):
+        if row[k] != target:
+            continue
+        _vote = data[k]
+        page = col[k]
+        for j in range(indptr[page], indptr[page + 1]):
+            if row[j] != target:
+                dot[row[j]] = dot.get(row[j], 0) + _vote * data[j]
+
+    r = [(users[user], _dot / math.sqrt(norm[target] * norm[user])) for user, _dot in dot.items()]
+    r.sort(key=lambda x: x[1], reverse=True)
+
+    return r if top is None else r[:top]
+
+
+async def vote_sync(*, limit: int = 10, url: str, store: dict, ttl: Optional[float] = None, errors: Optional[list] = None, **kwargs) -> dict:
+    """|AMC| |Coroutine| Update voter snapshot, requesting WhoRatedPageModule only for changed pages
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        store: dict
+            voter snapshot, updated in place. Pass {} (or wikidot.cache.load()) for the first sync.
+            {
+                "pages": {
+                    fullname: {
+                        "pageid": int,
+                        "rating": int,
+                        "rating_votes": int,
+                        "voters": {user_id: vote},
+                        "fetched_at": datetime
+                    }
+                }
+            }
+        ttl: Optional[float], by default None
+            seconds after which voters are refetched even if rating is unchanged
+            (same rating and count does not always mean the same voters)
+        errors: Optional[list], by default None
+            if given, pages whose voters could not be requested are appended as wikidot.scheduler.MassError
+            (target is the pageid) and left unchanged in store; they are requested again on the next sync.
+            if None, such a failure is raised and store is left unchanged.
+        <listpages_module_arguments>: **kwargs
+            selector of target pages, passed to page_getdata_mass
+            (module_body and main_key are not accepted)
+
+    Raises:
+        wikidot.exceptions.ArgumentsError(msg, reason)
+            module_body or main_key is given in kwargs
+        wikidot.exceptions.DeadlineExceededError(msg, reason)
+            the deadline of wikidot.scheduler.deadlinecontext() passed before the sweep finished.
+            store is left unchanged.
+
+    Returns:
+        dict
+            {
+                "added": [(pageid, user_id, vote), ...],
+                "removed": [(pageid, user_id, vote), ...],
+                "flipped": [(pageid, user_id, before, after), ...]
+            }
+    """
+    """
+    MEMO:
+        1. ListPagesでrating/rating_votesのみ取得
+        2. snapshotと比較し、差があるページ・ttl切れのページ・新規ページのみvote_getvoter_massで取得
+        3. voterの集合を比較して差分を返す
+        ・storeの変更は全ての取得が終わってから行う
+    """
+    for key in ("module_body", "main_key"):
+        if key in kwargs:
+            raise exceptions.ArgumentsError(
+                f"'{key}' cannot be used with vote_sync.", "reserved_argument"
+            )
+
+    pages = store.setdefault("pages", {})
+    now = datetime.now()
+
+    _meta = await page_getdata_mass(limit=limit, url=url, module_body=["fullname", "rating", "rating_votes"], **kwargs)
+    if _meta is None:
+        _meta = {}
+    # a sweep cut short by the deadline is not the whole site
+    scheduler.checkdeadline()
+
+    targets = []
+    for fullname, meta in _meta.items():
+        before = pages.get(fullname)
+        if before is None \
+                or meta["rating"] != before["rating"] \
+                or meta["rating_votes"] != before["rating_votes"] \
+                or (ttl is not None and (now - before["fetched_at"]).total_seconds() >= ttl):
+            targets.append(fullname)
+
+    ids = {fullname: pages[fullname]["pageid"] for fullname in targets if fullname in pages}
+    ids.update(await page_getid_mass(limit=limit, url=url, targets=[fullname for fullname in targets if fullname not in ids]))
+    byid = {pageid: fullname for fullname, pageid in ids.items() if pageid is not None}
+
+    _rs = await vote_getvoter_mass(limit=limit, url=url, targets=list(byid), errors=errors, strict=True)
+    # do not apply partial results
+    scheduler.checkdeadline()
+
+    # removed pages
+    for fullname in list(pages):
+        if fullname not in _meta:
+            del pages[fullname]
+
+    r = {
+        "added": [],
+        "removed": [],
+        "flipped": []
+    }
+
+    for pageid, _voters in _rs:
+        fullname = byid[pageid]
+        voters = {user_id: vote for _, _, user_id, vote in _voters if user_id is not None}
+        before = pages[fullname]["voters"] if fullname in pages else {}
+
+        for user_id, vote in voters.items():
+            if user_id not in before:
+                r["added"].append((pageid, user_id, vote))
+            elif before[user_id] != vote:
+                r["flipped"].append((pageid, user_id, before[user_id], vote))
+        for user_id, vote in before.items():
+            if user_id not in voters:
+                r["removed"].append((pageid, user_id, vote))
+
+        pages[fullname] = {
+            "pageid": pageid,
+            "rating": _meta[fullname]["rating"],
+            "rating_votes": _meta[fullname]["rating_votes"],
+            "voters": voters,
+            "fetched_at": now
+        }
 
-    stmt = []
-    for t in targets:
-        stmt.append(_innerfunc(**{"url": url, "pageid": t}))
+    logger.info(
+        f"VoteSync | {url} | pages: {len(_meta)}, fetched: {len(_rs)}, "
+        f"added: {len(r['added'])}, removed: {len(r['removed'])}, flipped: {len(r['flipped'])}"
+    )
 
-    return await asyncio.gather(*stmt)
+    return r
 
 
 @decorator.require_session
@@ -2130,27 +3406,197 @@ async def file_getlist(*, url: str, pageid: int):
     return pageid, r
 
 
-async def file_getlist_mass(*, limit: int = 10, url: str, targets: List[int]):
-    sema = asyncio.Semaphore(limit)
+async def file_getlist_mass(*, limit: int = 10, url: str, targets: List[int], errors: Optional[list] = None):
+    async def _innerfunc(pageid):
+        try:
+            pageid, list = await file_getlist(url=url, pageid=pageid)
+            return pageid, list if list is not None else ()
+        except exceptions.StatusIsNotOKError as e:
+            if e.args[1] == "no_page":
+                return pageid, None
+            else:
+                raise
 
-    async def _innerfunc(**kwargs):
-        async with sema:
+    r = await scheduler.runpool(_innerfunc, targets, limit=limit, errors=errors)
+
+    return r
+
+
+async def file_download(*, url: str, fileinfo: tuple, directory: str, manifest: dict, chunksize: int = 65536) -> str:
+    """|Coroutine| Download a file to content-addressed storage
+
+    Arguments:
+        url: str
+            target site url
+        fileinfo: tuple
+            file_getlist's file tuple: (fileid, filename, link, mime, size)
+        directory: str
+            root directory of the storage
+            files are stored as [directory]/objects/[sha256[:2]]/[sha256]
+        manifest: dict
+            file_download_mass's manifest, updated in place
+        chunksize: int, by default 65536
+            bytes per chunk written to disk
+
+    Returns:
+        str
+            "skipped": already stored with the same id and size
+            "deduplicated": downloaded, and the same content was already stored
+            "downloaded": downloaded and stored
+    """
+    """
+    MEMO:
+        ・[directory]/partial/[fileid].partに逐次書き込み、途中から再開する場合はRangeヘッダで続きを要求
+            -> 206以外が返ってきたら最初から書き直す
+        ・書き込みと同時にsha256を計算し、同じ内容が既にあれば.partを削除(重複排除)
+        ・ファイルの読み書きとハッシュ計算はrun_in_executorで行い、イベントループを止めない
+        ・requestschedulerの枠はレスポンスヘッダを受け取るまでのみ使い、本体の受信中はAPIリクエストに枠を空ける
+    """
+    fileid, filename, link, mime, size = fileinfo
+    files = manifest.setdefault("files", {})
+    objects = manifest.setdefault("objects", {})
+
+    _known = files.get(fileid)
+    if _known is not None and _known["size"] == size and os.path.exists(objects.get(_known["sha256"], "")):
+        return "skipped"
+
+    os.makedirs(os.path.join(directory, "partial"), exist_ok=True)
+    partpath = os.path.join(directory, "partial", f"{fileid}.part")
+
+    loop = asyncio.get_event_loop()
+
+    def _hashpart():
+        _digest = hashlib.sha256()
+        _offset = 0
+        if os.path.exists(partpath):
+            with open(partpath, "rb") as f:
+                for _chunk in iter(lambda: f.read(chunksize), b""):
+                    _digest.update(_chunk)
+                    _offset += len(_chunk)
+        return _digest, _offset
+
+    digest, offset = await loop.run_in_executor(None, _hashpart)
+
+    headers = {"Cookie": variables.request_header["Cookie"]}
+    if offset > 0:
+        headers["Range"] = f"bytes={offset}-"
+
+    _client = connector.client()
+    # the request slot is held only until the response headers arrive
+    async with scheduler.requestscheduler.slot():
+        _r = await _client.send(
+            _client.build_request("GET", link, headers=headers, timeout=60.0), stream=True, follow_redirects=True
+        )
+    try:
+        if _r.status_code == 416:
+            # the part file is already complete
+            pass
+        elif _r.status_code not in (200, 206):
+            raise exceptions.RequestFailedError(
+                "Status code is not 200.", _r.status_code
+            )
+        else:
+            if _r.status_code == 200 and offset > 0:
+                # server ignored Range, start over
+                logger.info(f"FileDownload | {fileid} | resume is not supported, restarting")
+                digest = hashlib.sha256()
+                offset = 0
+
+            def _write(f, chunk: bytes):
+                f.write(chunk)
+                digest.update(chunk)
+
+            f = await loop.run_in_executor(None, open, partpath, "ab" if offset > 0 else "wb")
             try:
-                pageid, list = await file_getlist(**kwargs)
-                return pageid, list if list is not None else ()
-            except exceptions.StatusIsNotOKError as e:
-                if e.args[1] == "no_page":
-                    return kwargs["pageid"], None
-                else:
-                    raise
+                async for _chunk in _r.aiter_bytes(chunksize):
+                    await loop.run_in_executor(None, _write, f, _chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+    finally:
+        await _r.aclose()
+
+    sha256 = digest.hexdigest()
+    objectpath = os.path.join(directory, "objects", sha256[:2], sha256)
+
+    if os.path.exists(objectpath):
+        os.remove(partpath)
+        status = "deduplicated"
+    else:
+        os.makedirs(os.path.dirname(objectpath), exist_ok=True)
+        os.replace(partpath, objectpath)
+        status = "downloaded"
+
+    objects[sha256] = objectpath
+    files[fileid] = {
+        "name": filename,
+        "link": link,
+        "mime": mime,
+        "size": size,
+        "sha256": sha256
+    }
 
-    stmt = []
-    for t in targets:
-        stmt.append(_innerfunc(**{"url": url, "pageid": t}))
+    logger.info(f"FileDownload | {url} | {fileid} {filename} | {status}")
 
-    r = await asyncio.gather(*stmt)
+    return status
 
-    return r
+
+async def file_download_mass(*, limit: int = 10, url: str, targets: List[int], directory: str, manifest: dict,
+                             errors: Optional[list] = None) -> List[Tuple[int, int, str]]:
+    """|AMC| |Coroutine| Mirror files attached to pages
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+        targets: list[int]
+            list of target pages' id
+        directory: str
+            root directory of the storage
+        manifest: dict
+            site-wide file manifest, updated in place. Pass {} (or wikidot.cache.load()) for the first run.
+            {
+                "pages": {pageid: [fileid, ...]},
+                "files": {fileid: {"name", "link", "mime", "size", "sha256"}},
+                "objects": {sha256: stored path}
+            }
+        errors: Optional[list], by default None
+            if given, failures are appended as wikidot.scheduler.MassError and left out of the result.
+            target is the pageid (file list failed) or (pageid, fileinfo) (download failed).
+            retry with targets=[e.target if isinstance(e.target, int) else e.target[0] for e in errors];
+            files already stored are skipped.
+
+    Returns:
+        list
+            [(pageid, fileid, status), ...]
+            status: file_download's value, or "failed" (only when errors is None)
+    """
+    pages = manifest.setdefault("pages", {})
+
+    _lists = await file_getlist_mass(limit=limit, url=url, targets=targets, errors=errors)
+
+    async def _innerfunc(target: Tuple[int, tuple]):
+        pageid, fileinfo = target
+        try:
+            return pageid, fileinfo[0], await file_download(url=url, fileinfo=fileinfo, directory=directory, manifest=manifest)
+        except Exception:
+            if errors is not None:
+                raise
+            logger.error(f"FileDownload | {url} | {fileinfo[0]} | failed", exc_info=True)
+            return pageid, fileinfo[0], "failed"
+
+    for pageid, _files in _lists:
+        if _files is None:
+            pages.pop(pageid, None)
+        else:
+            pages[pageid] = [fileinfo[0] for fileinfo in _files]
+
+    return await scheduler.runpool(
+        _innerfunc,
+        ((pageid, fileinfo) for pageid, _files in _lists if _files is not None for fileinfo in _files),
+        limit=limit,
+        errors=errors
+    )
 
 
 # TODO: Fileinfoからデータ抜く関数
@@ -2163,76 +3609,120 @@ async def file_getlist_mass(*, limit: int = 10, url: str, targets: List[int]):
 # --------------------
 
 
-async def site_gethistory(*, url: str, limitpage: Optional[int] = None):
-    async def _get(*, url: str, page: int):
-        _r = await connector.connect(
-            url=url,
-            body={
-                "moduleName": "changes/SiteChangesListModule",
-                "perpage": "1000",
-                "page": page,
-                "options": "{'all':true}"
-            }
-        )
+class SiteChange(NamedTuple):
+    """A row of changes/SiteChangesListModule
 
-        _r_body = bs4(_r["body"], "lxml")
+    Compatible with the plain tuple that site_gethistory used to return:
+        (title, fullname, date, rev_no, author_name, author_unix, author_id, flags, comments)
+    """
+    title: str
+    fullname: str
+    date: datetime
+    rev_no: int
+    author_name: str
+    author_unix: str
+    author_id: Optional[int]
+    flags: List[str]
+    comments: Optional[str]
+
+
+def sitechange_parser(itemelement) -> SiteChange:
+    # comments
+    if itemelement.find("div", class_="comments") is not None:
+        comments = itemelement.find("div", class_="comments").get_text().strip()
+    else:
+        comments = None
+
+    # table
+    titleelem = itemelement.find("td", class_="title").find("a")
+    title = titleelem.get_text().strip()
+    if "\t" in title:
+        title = str(title.split("\t")[-1])
+    fullname = str(titleelem["href"]).replace("/", "").strip()
+    date = odate_parser(itemelement.find("td", class_="mod-date").find("span", class_="odate"))
+    rev_no = itemelement.find("td", class_="revision-no").get_text().strip()
+    rev_no = re.search(r"\d+", rev_no)
+    if rev_no is None:
+        rev_no = 0
+    else:
+        rev_no = int(rev_no.group())
+    if "deleted" not in itemelement.find("span", class_="printuser")["class"]:
+        authorelem = itemelement.find("span", class_="printuser").find("a")
+        author_name = authorelem.get_text()
+        author_unix = str(authorelem["href"]).replace("http://www.wikidot.com/user:info/", "").strip()
+        author_id = int(str(authorelem["onclick"]).replace("WIKIDOT.page.listeners.userInfo(", "").replace("); return false;", "").strip())
+    else:
+        author_name, author_unix, author_id = author_parser(itemelement.find("span", class_="printuser"))
+
+    flags = []
+    _flags = itemelement.find("td", class_="flags").find_all("span")
+    for _flag in _flags:
+        _flag = _flag.get_text()
+        if _flag == "N":
+            _flag = "new"
+        elif _flag == "S":
+            _flag = "source"
+        elif _flag == "T":
+            _flag = "title"
+        elif _flag == "R":
+            _flag = "rename"
+        elif _flag == "A":
+            _flag = "tag"
+        elif _flag == "M":
+            _flag = "meta"
+        elif _flag == "F":
+            _flag = "file"
+        else:
+            _flag = "undefined"
+        flags.append(_flag)
 
-        r = []
+    return SiteChange(title, fullname, date, rev_no, author_name, author_unix, author_id, flags, comments)
 
-        for item in _r_body.find_all("div", class_="changes-list-item"):
-            # comments
-            if item.find("div", class_="comments") is not None:
-                comments = item.find("div", class_="comments").get_text().strip()
-            else:
-                comments = None
-
-            # table
-            titleelem = item.find("td", class_="title").find("a")
-            title = titleelem.get_text().strip()
-            if "\t" in title:
-                title = str(title.split("\t")[-1])
-            fullname = str(titleelem["href"]).replace("/", "").strip()
-            date = odate_parser(item.find("td", class_="mod-date").find("span", class_="odate"))
-            rev_no = item.find("td", class_="revision-no").get_text().strip()
-            rev_no = re.search(r"\d+", rev_no)
-            if rev_no is None:
-                rev_no = 0
-            else:
-                rev_no = int(rev_no.group())
-            if "deleted" not in item.find("span", class_="printuser")["class"]:
-                authorelem = item.find("span", class_="printuser").find("a")
-                author_name = authorelem.get_text()
-                author_unix = str(authorelem["href"]).replace("http://www.wikidot.com/user:info/", "").strip()
-                author_id = int(str(authorelem["onclick"]).replace("WIKIDOT.page.listeners.userInfo(", "").replace("); return false;", "").strip())
-            else:
-                author_name, author_unix, author_id = author_parser(item.find("span", class_="printuser"))
-
-            flags = []
-            _flags = item.find("td", class_="flags").find_all("span")
-            for _flag in _flags:
-                _flag = _flag.get_text()
-                if _flag == "N":
-                    _flag = "new"
-                elif _flag == "S":
-                    _flag = "source"
-                elif _flag == "T":
-                    _flag = "title"
-                elif _flag == "R":
-                    _flag = "rename"
-                elif _flag == "A":
-                    _flag = "tag"
-                elif _flag == "M":
-                    _flag = "meta"
-                elif _flag == "F":
-                    _flag = "file"
-                else:
-                    _flag = "undefined"
-                flags.append(_flag)
 
-            r.append((title, fullname, date, rev_no, author_name, author_unix, author_id, flags, comments))
+async def site_gethistory_perpage(*, url: str, page: int, perpage: int = 1000, watermark: Optional[Tuple[datetime, str, int]] = None) -> Tuple[List[SiteChange], bool]:
+    """|AMC| |Coroutine| Get one page of site changes, newest first
 
-        return r
+    Arguments:
+        url: str
+            target site url
+            eg: "scp-jp.wikidot.com", "scpwiki.com"
+        page: int
+            page number of changes list
+        perpage: int, by default 1000
+            number of rows per page
+        watermark: Optional[tuple[datetime, str, int]], by default None
+            (date, fullname, rev_no) of the newest row already seen.
+            Parsing stops at the first row which is not newer than it.
 
+    Returns:
+        tuple[list[SiteChange], bool]
+            (rows newer than watermark, whether watermark or the end of the list was reached)
+    """
+    _r = await connector.connect(
+        url=url,
+        body={
+            "moduleName": "changes/SiteChangesListModule",
+            "perpage": str(perpage),
+            "page": page,
+            "options": "{'all':true}"
+        }
+    )
+
+    _r_body = bs4(_r["body"], "lxml")
+
+    r = []
+
+    items = _r_body.find_all("div", class_="changes-list-item")
+    for item in items:
+        row = sitechange_parser(item)
+        if watermark is not None and (row.date < watermark[0] or (row.date, row.fullname, row.rev_no) == tuple(watermark)):
+            return r, True
+        r.append(row)
+
+    return r, len(items) < perpage
+
+
+async def site_gethistory(*, url: str, limitpage: Optional[int] = None) -> List[SiteChange]:
     if limitpage is None:
         pages = await page_getdata_mass(url=url, module_body=["fullname", "revisions"])
         cnt = 0
@@ -2240,22 +3730,290 @@ async def site_gethistory(*, url: str, limitpage: Optional[int] = None):
             cnt += page["revisions"]
         limitpage = math.ceil(cnt / 1000)
 
-    sema = asyncio.Semaphore(10)
-
     async def _innerfunc(page):
-        async with sema:
-            return await _get(url=url, page=page)
-
-    stmt = []
-    for i in range(1, limitpage + 1):
-        stmt.append(
-            _innerfunc(i)
-        )
+        r, _ = await site_gethistory_perpage(url=url, page=page)
+        return r
 
-    _rr = await asyncio.gather(*stmt)
+    _rr = await scheduler.runpool(_innerfunc, range(1, limitpage + 1), limit=10)
 
     r = []
     for _r in _rr:
         r.extend(_r)
 
     return r
+
+
+async def site_gethistory_since(*, url: str, watermark: Optional[Tuple[datetime, str, int]], perpage: int = 50, limitpage: Optional[int] = None) -> List[SiteChange]:
+    """|AMC| |Coroutine| Get site changes newer than watermark
+
+    Arguments:
+        url: str
+            target site url
+            eg: "scp-jp.wikidot.com", "scpwiki.com"
+        watermark: Optional[tuple[datetime, str, int]]
+            (date, fullname, rev_no) of the newest row already seen.
+            if None, only the first page is returned.
+        perpage: int, by default 50
+            number of rows per request
+            Pages are requested one by one until the watermark is reached.
+        limitpage: Optional[int], by default None
+            upper limit of requested pages
+
+    Returns:
+        list[SiteChange]
+            changes newer than watermark, newest first
+    """
+    """
+    MEMO:
+        ・watermarkに到達した時点で以降の行のパースもリクエストも行わない
+        ・perpageを小さくしておけば、変更が少ないときは1リクエスト・数行のパースで済む
+    """
+    r = []
+    page = 1
+    while limitpage is None or page <= limitpage:
+        _r, reached = await site_gethistory_perpage(url=url, page=page, perpage=perpage, watermark=watermark)
+        r.extend(_r)
+        if reached or watermark is None:
+            break
+        page += 1
+
+    return r
+
+
+async def site_watchhistory(*, urls: List[str], watermarks: Optional[dict] = None, subscribers: Optional[list] = None,
+                            limit: int = 10, perpage: int = 50, interval: float = 60.0,
+                            mininterval: float = 10.0, maxinterval: float = 600.0):
+    """|AMC| |Coroutine| |AsyncGenerator| Watch site changes of multiple sites
+
+    Arguments:
+        urls: list[str]
+            target sites' url
+            eg: ["scp-jp.wikidot.com", "scpwiki.com"]
+        watermarks: Optional[dict], by default None
+            {url: (date, fullname, rev_no)}
+            updated in place on every poll, so it can be stored and passed again to resume.
+            Sites without watermark start from their newest row without emitting events.
+        subscribers: Optional[list], by default None
+            callables (function or coroutine function) called with (url, SiteChange) on each change
+        limit: int, by default 10
+            semaphore value = number of parallel requests shared by all sites
+        perpage: int, by default 50
+            number of rows per request
+        interval: float, by default 60.0
+            initial poll interval (seconds)
+        mininterval / maxinterval: float, by default 10.0 / 600.0
+            bounds of the poll interval.
+            The interval is halved when a poll finds changes, and stretched by 1.5 times when it does not.
+
+    Yields:
+        tuple[str, SiteChange]
+            (url, change), oldest first per site
+    """
+    if watermarks is None:
+        watermarks = {}
+    if subscribers is None:
+        subscribers = []
+
+    sema = asyncio.Semaphore(limit)
+    queue = asyncio.Queue()
+
+    async def _watch(url):
+        _interval = interval
+        while True:
+            try:
+                async with sema:
+                    changes = await site_gethistory_since(url=url, watermark=watermarks.get(url), perpage=perpage)
+            except Exception:
+                logger.warning(f"WatchHistory | failed to poll {url}", exc_info=True)
+                changes = None
+
+            if changes:
+                newest = changes[0]
+                if url in watermarks:
+                    for change in reversed(changes):
+                        await queue.put((url, change))
+                    _interval = max(mininterval, _interval / 2)
+                watermarks[url] = (newest.date, newest.fullname, newest.rev_no)
+            else:
+                _interval = min(maxinterval, _interval * 1.5)
+
+            logger.debug(f"WatchHistory | {url} | next poll after {_interval:.1f}sec")
+            await asyncio.sleep(_interval)
+
+    tasks = [asyncio.ensure_future(_watch(url)) for url in urls]
+
+    try:
+        while True:
+            url, change = await queue.get()
+            for subscriber in subscribers:
+                _r = subscriber(url, change)
+                if asyncio.iscoroutine(_r):
+                    await _r
+            yield url, change
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# --------------------
+# Mirror
+# --------------------
+
+
+async def mirror_sync(*, limit: int = 10, url: str, store: dict, kinds: Union[list, tuple] = ("source", "votes", "files"), **kwargs) -> dict:
+    """|AMC| |Coroutine| Refresh a local mirror of the site, only where pages were changed
+
+    Arguments:
+        limit: int, by default 10
+            semaphore value = number of parallel executions
+        url: str
+            target site url
+            eg: "scp-jp.wikidot.com", "scpwiki.com"
+        store: dict
+            local store, updated in place. Pass {} (or wikidot.cache.load()) for the first sync.
+            {
+                "pages": {
+                    fullname: {
+                        "pageid": int,
+                        "meta": page_getdata's value,
+                        "source": Optional[str],
+                        "votes": vote_getvoter's value,
+                        "files": file_getlist's value
+                    }
+                },
+                "watermark": site history watermark (date, fullname, rev_no)
+            }
+        kinds: Union[list, tuple], by default ("source", "votes", "files")
+            data kinds to mirror besides ListPages metadata
+        <listpages_module_arguments>: **kwargs
+            selector of mirrored pages, passed to page_getdata_mass
+            (module_body and main_key are not accepted)
+
+    Raises:
+        wikidot.exceptions.ArgumentsError(msg, reason)
+            module_body or main_key is given in kwargs
+        wikidot.exceptions.DeadlineExceededError(msg, reason)
+            the deadline of wikidot.scheduler.deadlinecontext() passed before the sweep finished.
+            store is left unchanged.
+
+    Returns:
+        dict
+            {
+                "added": [fullname, ...],
+                "removed": [fullname, ...],
+                "updated": {fullname: [kind, ...]}
+            }
+    """
+    """
+    MEMO:
+        1. 前回のwatermark以降のサイト履歴を取得
+            -> ListPagesより先に取得する(後だと、間に行われた編集をwatermarkが追い越してしまう)
+        2. ListPagesを1周してメタデータを取得(250件/リクエスト)
+        3. revisions/updated_atが変わったページ -> source (履歴にFフラグがあればfilesも)
+            -> 履歴の件数がrevisionsの増分と合わない(フラグで説明できない)場合はsourceとfilesを取得
+           rating/rating_votesが変わったページ -> votes
+           新規ページ -> 全て
+        4. 必要なページのみpage_getsource_mass/vote_getvoter_mass/file_getlist_massで取得
+    """
+    for key in ("module_body", "main_key"):
+        if key in kwargs:
+            raise exceptions.ArgumentsError(
+                f"'{key}' cannot be used with mirror_sync.", "reserved_argument"
+            )
+
+    pages = store.setdefault("pages", {})
+
+    # History since last sync, before the sweep so that the new watermark does not pass edits made during it
+    watermark = store.get("watermark")
+    changes = await site_gethistory_since(url=url, watermark=watermark)
+    flagged = {}
+    revisions = {}
+    for change in changes:
+        flagged.setdefault(change.fullname, set()).update(change.flags)
+        revisions[change.fullname] = revisions.get(change.fullname, 0) + 1
+
+    # ListPages sweep
+    _meta = await page_getdata_mass(limit=limit, url=url, **kwargs)
+    if _meta is None:
+        _meta = {}
+    # a sweep cut short by the deadline is not the whole site
+    scheduler.checkdeadline()
+
+    added = [fullname for fullname in _meta if fullname not in pages]
+    removed = [fullname for fullname in pages if fullname not in _meta]
+
+    todo = {}
+    for fullname, meta in _meta.items():
+        if fullname not in pages:
+            todo[fullname] = set(kinds)
+            continue
+
+        before = pages[fullname]["meta"]
+        _kinds = set()
+        if meta["revisions"] != before["revisions"] or meta["updated_at"] != before["updated_at"]:
+            _flags = flagged.get(fullname)
+            # history watermark is missing, or the history does not cover every new revision
+            if watermark is None or _flags is None or revisions[fullname] != meta["revisions"] - before["revisions"]:
+                _kinds.update(("source", "files"))
+            else:
+                if _flags & {"new", "source"}:
+                    _kinds.add("source")
+                if "file" in _flags:
+                    _kinds.add("files")
+        if meta["rating"] != before["rating"] or meta["rating_votes"] != before["rating_votes"]:
+            _kinds.add("votes")
+        _kinds &= set(kinds)
+        if _kinds:
+            todo[fullname] = _kinds
+
+    # PageIDs of new pages
+    _ids = await page_getid_mass(limit=limit, url=url, targets=added)
+    scheduler.checkdeadline()
+    ids = {fullname: pages[fullname]["pageid"] for fullname in _meta if fullname in pages}
+    ids.update(_ids)
+
+    # new pages without id are left for the next sync
+    for fullname in [fullname for fullname in added if ids[fullname] is None]:
+        logger.warning(f"Mirror | {fullname} | page id is not resolved, retry on the next sync")
+        added.remove(fullname)
+        del _meta[fullname]
+        del todo[fullname]
+
+    def _targets(kind):
+        return [ids[fullname] for fullname, _kinds in todo.items() if kind in _kinds and ids[fullname] is not None]
+
+    sources = await page_getsource_mass(limit=limit, url=url, targets=_targets("source"))
+    votes = await vote_getvoter_mass(limit=limit, url=url, targets=_targets("votes"))
+    files = await file_getlist_mass(limit=limit, url=url, targets=_targets("files"))
+    # do not apply partial results (meta would be updated without its data)
+    scheduler.checkdeadline()
+
+    # Apply
+    for fullname in removed:
+        del pages[fullname]
+
+    for fullname, meta in _meta.items():
+        pages.setdefault(fullname, {
+            "pageid": ids[fullname],
+            "source": None,
+            "votes": [],
+            "files": []
+        })["meta"] = meta
+
+    byid = {ids[fullname]: fullname for fullname in todo}
+    for kind, _rs in (("source", sources), ("votes", votes), ("files", files)):
+        for pageid, value in _rs:
+            pages[byid[pageid]][kind] = value
+
+    if changes:
+        store["watermark"] = (changes[0].date, changes[0].fullname, changes[0].rev_no)
+
+    logger.info(
+        f"Mirror | {url} | added: {len(added)}, removed: {len(removed)}, updated: {len(todo) - len(added)}"
+    )
+
+    return {
+        "added": added,
+        "removed": removed,
+        "updated": {fullname: sorted(_kinds) for fullname, _kinds in todo.items() if fullname not in added}
+    }
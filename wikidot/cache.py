@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+""""wikidot.cache
+
+Local store persistence for wikidot.py
+
+version:
+    1.0.0
+copyright:
+    (c) 2020 ukwhatn
+license:
+    MIT License
+    legal: http://expunged.xyz/assets/docs/MIT.txt
+
+"""
+
+import os
+import pickle
+from typing import Any
+
+
+def load(*, path: str, default: Any = None) -> Any:
+    """Load a store saved by cache.save
+
+    Arguments:
+        path: str
+            file path
+        default: Any, by default None
+            returned when the file does not exist
+            if None, an empty dict is returned.
+
+    Returns:
+        Any
+            stored object
+
+    Note:
+        Stores are pickled. Do not load files from untrusted sources.
+    """
+    if not os.path.exists(path):
+        return {} if default is None else default
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save(*, path: str, obj: Any) -> None:
+    """Save a store atomically
+
+    Arguments:
+        path: str
+            file path
+        obj: Any
+            object to store (dicts returned or updated by wikidot.py functions)
+    """
+    _tmp = f"{path}.tmp"
+    with open(_tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(_tmp, path)
+
+
+# --------------------
+# Lookup caches
+# --------------------
+
+# {site: {threadid: (fullname, pageid)}}
+threadparent = {}  # type: dict
+# {site: {pageid: threadid}}
+pagediscussion = {}  # type: dict
+# {site: {fullname: pageid}}
+pageid = {}  # type: dict
+# {unix_name: (Optional[user_id], stored_at)}  None = user not found
+userid = {}  # type: dict
+
+
+def site(url: str) -> str:
+    """Normalize site url used as the key of lookup caches"""
+    return url.replace("https://", "").replace("http://", "").rstrip("/")
+
+
+def unixname(user: str) -> str:
+    """Normalize user name used as the key of userid cache"""
+    return user.strip().lower().replace(" ", "-").replace("_", "-").lstrip("-")
+
+
+def save_lookups(*, path: str) -> None:
+    """Save all lookup caches of this module"""
+    save(path=path, obj={
+        "threadparent": threadparent,
+        "pagediscussion": pagediscussion,
+        "pageid": pageid,
+        "userid": userid
+    })
+
+
+def load_lookups(*, path: str) -> None:
+    """Load lookup caches saved by cache.save_lookups, merging into current ones"""
+    _r = load(path=path)
+    for name, _cache in _r.items():
+        _current = globals().get(name)
+        if name == "userid":
+            _current.update(_cache)
+        elif isinstance(_current, dict):
+            for _site, _values in _cache.items():
+                _current.setdefault(_site, {}).update(_values)
@@ -17,8 +17,58 @@ license:
 import httpx
 import asyncio
 import html
+from typing import Optional
 
-from . import variables, exceptions, logger
+from . import variables, exceptions, logger, scheduler
+
+
+# shared HTTP client (connection pool) and the event loop it belongs to
+_client = None  # type: httpx.AsyncClient
+_client_loop = None  # type: asyncio.AbstractEventLoop
+
+
+def client() -> httpx.AsyncClient:
+    """Shared httpx.AsyncClient for the running event loop
+
+    Connections are pooled and reused by every request of wikidot.py.
+    A new client is created when the event loop has changed.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_event_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        _client_loop = loop
+    return _client
+
+
+async def get(*, url: str, headers: Optional[dict] = None, timeout: float = 60.0) -> httpx.Response:
+    """|Coroutine| HTTP GET request through the shared client, following redirects
+
+    Arguments:
+        url: str
+            request url
+            "http://" is added when scheme is omitted.
+        headers: Optional[dict], by default None
+            additional request headers
+        timeout: float, by default 60.0
+            request timeout (seconds)
+
+    Returns:
+        httpx.Response
+    """
+    if "http://" not in url and "https://" not in url:
+        url = "http://" + url
+    scheduler.counttry()
+    timeout = scheduler.timeout(timeout)
+
+    async def _request():
+        async with scheduler.requestscheduler.slot():
+            # http -> https and canonical host redirects (as feedparser did)
+            return await client().get(url, headers=headers, timeout=timeout, follow_redirects=True)
+
+    return await scheduler.withdeadline(_request())
 
 
 async def connect(*, url: str, body: dict, unescape: bool = True, attempt_count: int = 10) -> dict:
@@ -53,18 +103,20 @@ async def connect(*, url: str, body: dict, unescape: bool = True, attempt_count:
         if "http://" not in url and "https://" not in url:
             url = "http://" + url
 
-        async with httpx.AsyncClient() as client:
-            try:
-                _r = await client.post(
-                    f"{url}/ajax-module-connector.php",
-                    data=_request_body,
-                    headers=variables.request_header,
-                    timeout=60.0
-                )
-            except Exception:
-                raise exceptions.RequestFailedError(
-                    "Unexpected Error occurred while requesting", "request_error"
-                )
+        _timeout = scheduler.timeout(60.0)
+        try:
+            async with scheduler.requestscheduler.slot(write=_write):
+                with scheduler.hedger.timing(), scheduler.writegovernor.timing():
+                    _r = await client().post(
+                        f"{url}/ajax-module-connector.php",
+                        data=_request_body,
+                        headers=variables.request_header,
+                        timeout=_timeout
+                    )
+        except Exception:
+            raise exceptions.RequestFailedError(
+                "Unexpected Error occurred while requesting", "request_error"
+            )
         # Check statuscode
         if _r.status_code != 200:
             raise exceptions.RequestFailedError(
@@ -95,24 +147,42 @@ async def connect(*, url: str, body: dict, unescape: bool = True, attempt_count:
 
     _request_body.update(body)
 
+    # write actions go through the write governor
+    _write = scheduler.iswrite(_request_body)
+
     # Request
     _json = {}
     _st = False
     _cnt = 0
     while _st is False:
+        scheduler.checkdeadline()
+        scheduler.counttry()
         try:
-            _json = await _innerfunc(url=url, headers=variables.request_header, data=_request_body)
+            if _write:
+                async with scheduler.writegovernor.slot() as _slot:
+                    _json = await scheduler.withdeadline(_innerfunc(url=url, headers=variables.request_header, data=_request_body))
+                    _slot.throttled = _json["status"] == "try_again"
+            else:
+                _json = await scheduler.withdeadline(scheduler.hedger.run(
+                    _request_body.get("moduleName"),
+                    lambda: _innerfunc(url=url, headers=variables.request_header, data=_request_body)
+                ))
             r_status = _json["status"]
             if r_status == "try_again":
-                raise
+                raise exceptions.StatusIsNotOKError(
+                    "Wikidot asks to try again", r_status
+                )
             _st = True
+        except exceptions.DeadlineExceededError:
+            raise
         except Exception as e:
             if _cnt < attempt_count:
                 logger.logger.warning(
                     f"AMC | Failed, try again after 10sec... | {e.args[1]}"
                 )
                 _cnt += 1
-                await asyncio.sleep(10.0)
+                # raises DeadlineExceededError if the deadline comes first
+                await scheduler.sleep(10.0)
                 pass
             else:
                 logger.logger.error(
@@ -63,3 +63,8 @@ class SessionCreateError(SessionError):
 class NoAvailableSessionError(SessionError):
     # There is no available session when you try to do any actions.
     pass
+
+
+class DeadlineExceededError(WikidotError):
+    # The deadline of scheduler.deadlinecontext() has passed, or it was cancelled
+    pass
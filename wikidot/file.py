@@ -14,10 +14,15 @@ license:
 
 """
 
-from typing import List
+from typing import List, Optional
 from . import base, decorator
 
 
 @decorator.execute
-async def getlist(*, limit: int = 10, url: str, targets: List[int]):
-    return await base.file_getlist_mass(limit=limit, url=url, targets=targets)
+async def getlist(*, limit: int = 10, url: str, targets: List[int], errors: Optional[list] = None):
+    return await base.file_getlist_mass(limit=limit, url=url, targets=targets, errors=errors)
+
+
+@decorator.execute
+async def download(*, limit: int = 10, url: str, targets: List[int], directory: str, manifest: dict, errors: Optional[list] = None):
+    return await base.file_download_mass(limit=limit, url=url, targets=targets, directory=directory, manifest=manifest, errors=errors)
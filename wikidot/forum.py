@@ -24,23 +24,38 @@ async def getcategoies(*, url: str, includehidden: bool = True):
 
 
 @decorator.execute
-async def getthreadspercategory(*, limit: int = 10, url: str, categoryid: int):
-    return await base.forum_getthreads_percategory(limit=limit, url=url, categoryid=categoryid)
+async def getthreadspercategory(*, limit: int = 10, url: str, categoryid: int, cursor: Optional[dict] = None):
+    return await base.forum_getthreads_percategory(limit=limit, url=url, categoryid=categoryid, cursor=cursor)
 
 
 @decorator.execute
-async def getthreads(*, limit: int = 10, url: str, includehidden: bool = True):
-    return await base.forum_getthreads_mass(limit=limit, url=url, includehidden=includehidden)
+async def getthreads(*, limit: int = 10, url: str, includehidden: bool = True, categories: Optional[list] = None, errors: Optional[list] = None):
+    return await base.forum_getthreads_mass(limit=limit, url=url, includehidden=includehidden, categories=categories, errors=errors)
 
 
 @decorator.execute
-async def getposts(*, limit: int = 10, url: str, threadid: int):
-    return await base.forum_getposts_perthread(limit=limit, url=url, threadid=threadid)
+async def getposts(*, limit: int = 10, url: str, threadid: int, errors: Optional[list] = None):
+    return await base.forum_getposts_perthread(limit=limit, url=url, threadid=threadid, errors=errors)
 
 
 @decorator.execute
-async def getparentpage(*, limit: int = 10, url: str, targets: list, forumcategoryname: str = "forum"):
-    return await base.forum_getparentpage_mass(limit= limit, url=url, targets=targets, forumcategoryname=forumcategoryname)
+async def getpostpages(*, limit: int = 10, url: str, targets: list, errors: Optional[list] = None):
+    return await base.forum_getposts_pages(limit=limit, url=url, targets=targets, errors=errors)
+
+
+@decorator.execute
+async def getallposts(*, limit: int = 10, url: str, includehidden: bool = True, categories: Optional[list] = None, errors: Optional[list] = None):
+    return await base.forum_getposts_mass(limit=limit, url=url, includehidden=includehidden, categories=categories, errors=errors)
+
+
+@decorator.execute
+async def sync(*, limit: int = 10, url: str, store: dict, includehidden: bool = True):
+    return await base.forum_sync(limit=limit, url=url, store=store, includehidden=includehidden)
+
+
+@decorator.execute
+async def getparentpage(*, limit: int = 10, url: str, targets: list, forumcategoryname: str = "forum", errors: Optional[list] = None):
+    return await base.forum_getparentpage_mass(limit= limit, url=url, targets=targets, forumcategoryname=forumcategoryname, errors=errors)
 
 
 @decorator.execute
@@ -48,6 +63,11 @@ async def getpagediscussion(*, url: str, pageid: int):
     return await base.forum_getpagediscussion(url=url, pageid=pageid)
 
 
+@decorator.execute
+async def getpagediscussions(*, limit: int = 10, url: str, targets: list, comments: Optional[dict] = None, errors: Optional[list] = None):
+    return await base.forum_getpagediscussion_mass(limit=limit, url=url, targets=targets, comments=comments, errors=errors)
+
+
 @decorator.execute
 async def post(*, url: str, threadid: int, parentid: Optional[int] = None, title: str = "", content: str):
     return await base.forum_post(url=url, threadid=threadid, parentid=parentid, title=title, content=content)
@@ -59,5 +79,5 @@ async def edit(*, url: str, threadid: int, postid: int, title: str = "", content
 
 
 @decorator.execute
-async def rss(*, url: str, code: str):
-    return await base.rss_get(url=url, code=code)
+async def rss(*, url: str, code: str, state: Optional[dict] = None):
+    return await base.rss_get(url=url, code=code, state=state)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+""""wikidot.journal
+
+Append-only journal of mass mutations for wikidot.py
+
+version:
+    1.0.0
+copyright:
+    (c) 2020 ukwhatn
+license:
+    MIT License
+    legal: http://expunged.xyz/assets/docs/MIT.txt
+
+"""
+
+"""
+MEMO:
+    ・1行1レコードのJSONを追記する。各操作の前に"intent"、後に"done"/"failed"を書く
+    ・再開時は最後の状態が"done"のキーをスキップする
+        -> "intent"のみ残っている操作は、適用されたか不明なので再実行される
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any
+
+
+def makekey(*parts: Any) -> str:
+    """Key of an operation
+
+    Arguments:
+        *parts: Any
+            values identifying the operation (action name, site, target, new value...)
+
+    Returns:
+        str
+    """
+    return hashlib.sha1(json.dumps(parts, default=str, ensure_ascii=False).encode()).hexdigest()
+
+
+def write(*, path: str, key: str, state: str, **fields: Any) -> None:
+    """Append a record and flush it to disk
+
+    Arguments:
+        path: str
+            journal file path
+        key: str
+            makekey's value
+        state: str
+            "intent", "done" or "failed"
+        **fields: Any
+            additional values to record (target, error...)
+    """
+    record = {"key": key, "state": state, "time": datetime.now().isoformat()}
+    record.update(fields)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def done(*, path: str) -> set:
+    """Keys of operations completed in the journal
+
+    Arguments:
+        path: str
+            journal file path
+
+    Returns:
+        set[str]
+            keys whose last state is "done"
+    """
+    last = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line may be broken by a crash
+                continue
+            last[record["key"]] = record["state"]
+    return {key for key, state in last.items() if state == "done"}
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+""""wikidot.mirror
+
+Incremental site mirror for wikidot.py
+
+version:
+    1.0.0
+copyright:
+    (c) 2020 ukwhatn
+license:
+    MIT License
+    legal: http://expunged.xyz/assets/docs/MIT.txt
+
+"""
+
+from . import base, decorator
+from typing import Union
+
+
+@decorator.execute
+async def sync(*, limit: int = 10, url: str, store: dict, kinds: Union[list, tuple] = ("source", "votes", "files"), **kwargs):
+    return await base.mirror_sync(limit=limit, url=url, store=store, kinds=kinds, **kwargs)
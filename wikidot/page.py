@@ -24,8 +24,10 @@ from typing import Union, Optional, List, Tuple
 
 
 @decorator.execute
-async def getdata(*, limit: int = 10, url: str, main_key: str = "fullname", module_body: Optional[List[str]] = None, **kwargs):
-    return await base.page_getdata_mass(limit=limit, url=url, main_key=main_key, module_body=module_body, **kwargs)
+async def getdata(*, limit: int = 10, url: str, main_key: str = "fullname", module_body: Optional[List[str]] = None,
+                  offsets: Optional[List[int]] = None, errors: Optional[list] = None, **kwargs):
+    return await base.page_getdata_mass(limit=limit, url=url, main_key=main_key, module_body=module_body,
+                                        offsets=offsets, errors=errors, **kwargs)
 
 
 # --------------------
@@ -34,8 +36,8 @@ async def getdata(*, limit: int = 10, url: str, main_key: str = "fullname", modu
 
 
 @decorator.execute
-async def getid(*, limit: int = 10, url: str, targets: Union[list, tuple]) -> list:
-    return await base.page_getid_mass(limit=limit, url=url, targets=targets)
+async def getid(*, limit: int = 10, url: str, targets: Union[list, tuple], errors: Optional[list] = None) -> list:
+    return await base.page_getid_mass(limit=limit, url=url, targets=targets, errors=errors)
 
 
 # --------------------
@@ -44,8 +46,8 @@ async def getid(*, limit: int = 10, url: str, targets: Union[list, tuple]) -> li
 
 
 @decorator.execute
-async def getsource(*, url: str, targets: Union[List[int], Tuple[int]]) -> list:
-    return await base.page_getsource_mass(url=url, targets=targets)
+async def getsource(*, url: str, targets: Union[List[int], Tuple[int]], errors: Optional[list] = None) -> list:
+    return await base.page_getsource_mass(url=url, targets=targets, errors=errors)
 
 
 # --------------------
@@ -54,8 +56,8 @@ async def getsource(*, url: str, targets: Union[List[int], Tuple[int]]) -> list:
 
 
 @decorator.execute
-async def gethistory(*, limit: int = 10, url: str, targets: List[int]):
-    return await base.page_gethistory_mass(limit=limit, url=url, targets=targets)
+async def gethistory(*, limit: int = 10, url: str, targets: List[int], errors: Optional[list] = None):
+    return await base.page_gethistory_mass(limit=limit, url=url, targets=targets, errors=errors)
 
 
 # --------------------
@@ -68,13 +70,18 @@ async def edit(*, url: str, fullname: str, pageid: Optional[int] = None, title:
     return await base.page_edit(url=url, fullname=fullname, pageid=pageid, title=title, content=content, comment=comment, forceedit=forceedit)
 
 
+@decorator.execute
+async def editmass(*, limit: int = 10, url: str, targets: List[dict], forceedit: bool = False, journalpath: Optional[str] = None) -> list:
+    return await base.page_edit_mass(limit=limit, url=url, targets=targets, forceedit=forceedit, journalpath=journalpath)
+
+
 # --------------------
 # RenamePage
 # --------------------
 
 
-async def rename(*, limit: int = 10, url: str, targets: list):
-    return await base.page_rename_mass(limit=limit, url=url, targets=targets)
+async def rename(*, limit: int = 10, url: str, targets: list, journalpath: Optional[str] = None):
+    return await base.page_rename_mass(limit=limit, url=url, targets=targets, journalpath=journalpath)
 
 
 # --------------------
@@ -83,5 +90,5 @@ async def rename(*, limit: int = 10, url: str, targets: list):
 
 
 @decorator.execute
-async def setparent(*, limit: int = 10, url: str, targets: Union[list, tuple]):
-    return await base.page_setparent_mass(limit=limit, url=url, targets=targets)
+async def setparent(*, limit: int = 10, url: str, targets: Union[list, tuple], journalpath: Optional[str] = None):
+    return await base.page_setparent_mass(limit=limit, url=url, targets=targets, journalpath=journalpath)
@@ -0,0 +1,880 @@
+# -*- coding: utf-8 -*-
+
+""""wikidot.scheduler
+
+Request scheduling for wikidot.py
+
+version:
+    1.0.0
+copyright:
+    (c) 2020 ukwhatn
+license:
+    MIT License
+    legal: http://expunged.xyz/assets/docs/MIT.txt
+
+"""
+
+"""
+MEMO:
+    ・書き込み系のAMCリクエスト(action付き)は、読み込みとは別の枠(WriteGovernor)で制限する
+    ・AIMD: 成功して応答が速ければ同時実行数を少しずつ増やし、try_againや遅延があれば半分にする
+    ・待ち行列はジョブ(contextvar "job")ごとに分け、ラウンドロビンで枠を渡す
+    ・全てのHTTPリクエストはRequestSchedulerの枠を取ってから送る
+        -> 優先度(contextvar "priority")の高いクラスから順に枠を渡す(同じ優先度内はジョブごとにラウンドロビン)
+            -> 優先度が指定されていなければ、単発の呼び出しはNORMAL、workerpool(*_mass)の中はBULK
+        -> ジョブごとの同時実行数の上限(quotas)を超えるジョブは飛ばす
+    ・*_massはworkerpoolで実行する
+        -> limit個のワーカーがtargets(イテレータ/非同期イテレータ)から1件ずつ取り出して処理する
+        -> 一度に存在するコルーチンと結果のバッファはlimitに比例する(orderedでは先行をlimit*2件までに抑える)
+        -> errorsにリストを渡すと、失敗した対象は例外を投げずにMassErrorとして記録し、成功分だけを返す
+            -> 各対象のHTTP試行回数はcontextvar "attempts"で数える
+    ・deadlinecontextで期限(contextvar "deadline")を設定すると、ネストした呼び出し全体で共有される
+        -> connectorは残り時間を超えてリクエスト・リトライ待ちをせず、DeadlineExceededErrorを投げる
+        -> workerpoolは期限切れで新しい対象の取り出しをやめ、それまでの結果を返す
+    ・Hedger: 冪等な読み込みモジュールの応答が、直近の応答時間のp95を超えても返ってこなければ同じリクエストをもう1本送り、先に返った方を使う
+        -> 送れる追加リクエストはトークン(リクエスト1回につきbudget分たまる)で制限する
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from . import exceptions, logger
+
+
+logger = logger.logger
+
+# name of the job the current task belongs to
+job = contextvars.ContextVar("wikidot_job", default="default")
+
+# priority classes (smaller is served first)
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+
+# priority of the current task (None: not set, NORMAL for single calls and BULK inside workerpool)
+priority = contextvars.ContextVar("wikidot_priority", default=None)
+
+# HTTP attempt counter of the current target ([count], set by workerpool)
+attempts = contextvars.ContextVar("wikidot_attempts", default=None)
+
+# attempt of Hedger.run() the current task belongs to
+_hedgeattempt = contextvars.ContextVar("wikidot_hedgeattempt", default=None)
+
+# WriteGovernor slot the current task holds
+_writeslot = contextvars.ContextVar("wikidot_writeslot", default=None)
+
+# Deadline of the current task (set by deadlinecontext)
+deadline = contextvars.ContextVar("wikidot_deadline", default=None)
+
+# AMC modules which change the site besides "action" requests
+_write_modules = {"edit/PageEditModule"}
+
+
+class Deadline:
+    """Time budget shared by nested calls
+
+    Arguments:
+        seconds: Optional[float]
+            budget from now (None: no time limit, only cancel())
+        parent: Optional[Deadline]
+            enclosing deadline, which also bounds this one
+    """
+
+    def __init__(self, seconds: Optional[float] = None, parent: Optional["Deadline"] = None):
+        self.at = None if seconds is None else time.monotonic() + seconds
+        self.parent = parent
+        self.cancelled = False
+        # events of the calls waiting under this deadline (set by cancel())
+        self._waiters = set()
+
+    def cancel(self):
+        """Cancel every call running under this deadline"""
+        self.cancelled = True
+        for loop, event in list(self._waiters):
+            # cancel() may be called from another thread
+            loop.call_soon_threadsafe(event.set)
+
+    def _watch(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+        """Event set when this deadline or an enclosing one is cancelled"""
+        _w = (asyncio.get_running_loop(), asyncio.Event())
+        _d = self
+        while _d is not None:
+            _d._waiters.add(_w)
+            _d = _d.parent
+        if self.expired():
+            _w[1].set()
+        return _w
+
+    def _unwatch(self, waiter: Tuple[asyncio.AbstractEventLoop, asyncio.Event]):
+        _d = self
+        while _d is not None:
+            _d._waiters.discard(waiter)
+            _d = _d.parent
+
+    def reason(self) -> str:
+        """Reason of expiry: "cancelled" if this deadline or an enclosing one was cancelled, else "deadline"."""
+        _d = self
+        while _d is not None:
+            if _d.cancelled:
+                return "cancelled"
+            _d = _d.parent
+        return "deadline"
+
+    def remaining(self) -> Optional[float]:
+        """Remaining seconds (None: unlimited)"""
+        if self.expired():
+            return 0.0
+        r = None if self.at is None else self.at - time.monotonic()
+        if self.parent is not None:
+            _r = self.parent.remaining()
+            if _r is not None and (r is None or _r < r):
+                r = _r
+        return r
+
+    def expired(self) -> bool:
+        if self.cancelled or (self.at is not None and time.monotonic() >= self.at):
+            return True
+        return self.parent is not None and self.parent.expired()
+
+
+@contextmanager
+def deadlinecontext(seconds: Optional[float] = None):
+    """Run calls inside the block within `seconds`
+
+    Usage:
+        >>> with wikidot.scheduler.deadlinecontext(300) as d:
+        ...     await wikidot.base.tag_replace(...)  # d.cancel() from another task stops it
+    """
+    _d = Deadline(seconds, deadline.get())
+    token = deadline.set(_d)
+    try:
+        yield _d
+    finally:
+        deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Remaining seconds of the current deadline (None: no deadline)"""
+    _d = deadline.get()
+    return None if _d is None else _d.remaining()
+
+
+def expired() -> bool:
+    _d = deadline.get()
+    return _d is not None and _d.expired()
+
+
+def checkdeadline():
+    """Raise DeadlineExceededError if the current deadline has passed"""
+    if expired():
+        raise exceptions.DeadlineExceededError(
+            "Deadline exceeded", deadline.get().reason()
+        )
+
+
+def timeout(seconds: float) -> float:
+    """`seconds` clamped to the remaining time"""
+    checkdeadline()
+    _r = remaining()
+    return seconds if _r is None else min(seconds, _r)
+
+
+async def sleep(seconds: float):
+    """asyncio.sleep() which raises DeadlineExceededError instead of sleeping past the deadline or after cancel()"""
+    if deadline.get() is None:
+        await asyncio.sleep(seconds)
+        return
+    await withdeadline(asyncio.sleep(seconds))
+
+
+async def withdeadline(aw: Awaitable):
+    """Await `aw`, raising DeadlineExceededError when the deadline passes or is cancelled first"""
+    _d = deadline.get()
+    if _d is None:
+        return await aw
+    checkdeadline()
+    _task = asyncio.ensure_future(aw)
+    _waiter = _d._watch()
+    _cancel = asyncio.ensure_future(_waiter[1].wait())
+    try:
+        await asyncio.wait({_task, _cancel}, timeout=_d.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        if _task.done():
+            return _task.result()
+        raise exceptions.DeadlineExceededError(
+            "Deadline exceeded", _d.reason()
+        )
+    finally:
+        _d._unwatch(_waiter)
+        _cancel.cancel()
+        if not _task.done():
+            _task.cancel()
+            # wait for the cleanup of aw (e.g. releasing request slots)
+            await asyncio.wait({_task})
+        if not _task.cancelled():
+            _task.exception()
+
+
+async def cleanup(factory: Callable[[], Awaitable], *, seconds: float = 60.0, name: str = ""):
+    """|Coroutine| Run a cleanup request (e.g. releasing an edit lock) outside the current deadline
+
+    The cleanup gets its own deadline of `seconds` instead of the job's one (which has usually passed),
+    keeps running when the caller is cancelled, and failures are logged instead of raised.
+
+    Arguments:
+        factory: Callable[[], Awaitable]
+            returns the cleanup coroutine
+        seconds: float, by default 60.0
+            time limit of the cleanup
+        name: str, by default ""
+            name used in the log
+
+    Returns:
+        result of factory(), or None if it failed
+    """
+    async def _run():
+        deadline.set(Deadline(seconds))
+        try:
+            return await factory()
+        except Exception:
+            logger.error(f"Cleanup | {name} failed", exc_info=True)
+            return None
+
+    return await asyncio.shield(asyncio.ensure_future(_run()))
+
+
+class MassError(NamedTuple):
+    """Failed target of a mass function
+
+    target: the target as it was given (pass [e.target for e in errors] to retry)
+    exception: exception class name
+    status: Wikidot status or reason (args[1] of the innermost wikidot exception) if any
+    attempts: number of HTTP attempts made for the target
+    message: exception message
+    """
+    target: Any
+    exception: str
+    status: Any
+    attempts: int
+    message: str
+
+
+def _status(e: BaseException):
+    # innermost Wikidot status (functions often re-raise as UnexpectedError)
+    status = None
+    while e is not None:
+        if isinstance(e, exceptions.WikidotError) and len(e.args) > 1:
+            status = e.args[1]
+        e = e.__cause__ or e.__context__
+    return status
+
+
+def counttry():
+    """Count one HTTP attempt for the current target (called by connector)"""
+    _counter = attempts.get()
+    if _counter is not None:
+        _counter[0] += 1
+
+
+def iswrite(body: dict) -> bool:
+    """Whether the AMC request body is a write action"""
+    return ("action" in body and body.get("moduleName", "Empty") == "Empty") or body.get("moduleName") in _write_modules
+
+
+@contextmanager
+def jobcontext(name: str):
+    """Run requests inside the block as job `name`
+
+    Usage:
+        >>> with wikidot.scheduler.jobcontext("tag-migration"):
+        ...     await wikidot.base.tag_replace(...)
+    """
+    token = job.set(name)
+    try:
+        yield
+    finally:
+        job.reset(token)
+
+
+@contextmanager
+def prioritycontext(value: int):
+    """Run requests inside the block with priority `value`
+
+    Usage:
+        >>> with wikidot.scheduler.prioritycontext(wikidot.scheduler.BULK):
+        ...     await wikidot.base.page_getdata_mass(...)
+    """
+    token = priority.set(value)
+    try:
+        yield
+    finally:
+        priority.reset(token)
+
+
+class RequestScheduler:
+    """Priority-aware concurrency limiter shared by every HTTP request
+
+    Arguments:
+        limit: int, by default 20
+            number of concurrent requests of the whole process
+        quotas: Optional[dict], by default None
+            maximum concurrent requests per job name, eg: {"crawl": 8}
+        defaultquota: Optional[int], by default None
+            quota of jobs not in `quotas` (None: no quota)
+        writereserve: int, by default 2
+            extra slots only write requests can use
+            writes are served before every priority class and are not counted against quotas.
+    """
+
+    def __init__(self, *, limit: int = 20, quotas: dict = None, defaultquota: int = None, writereserve: int = 2):
+        self.limit = limit
+        self.quotas = {} if quotas is None else quotas
+        self.defaultquota = defaultquota
+        self.writereserve = writereserve
+        self.active = 0
+        self.running = {}  # type: dict[str, int]
+        self._waiters = [OrderedDict() for _ in range(BULK + 1)]
+        self._writewaiters = deque()
+
+    def _quota(self, name: str):
+        return self.quotas.get(name, self.defaultquota)
+
+    def _wakeup(self):
+        # writes first, they can also use the reserved slots
+        while self._writewaiters and self.active < self.limit + self.writereserve:
+            name, future = self._writewaiters.popleft()
+            if not future.done():
+                self.active += 1
+                self.running[name] = self.running.get(name, 0) + 1
+                future.set_result(None)
+
+        while self.active < self.limit:
+            for queues in self._waiters:
+                _picked = None
+                for name in queues:
+                    _quota = self._quota(name)
+                    if _quota is None or self.running.get(name, 0) < _quota:
+                        _picked = name
+                        break
+                if _picked is not None:
+                    break
+            else:
+                return
+
+            waiters = queues[_picked]
+            future = waiters.popleft()
+            if waiters:
+                queues.move_to_end(_picked)
+            else:
+                del queues[_picked]
+            if not future.done():
+                self.active += 1
+                self.running[_picked] = self.running.get(_picked, 0) + 1
+                future.set_result(None)
+
+    async def acquire(self, *, write: bool = False) -> str:
+        name = job.get()
+        future = asyncio.get_event_loop().create_future()
+        if write:
+            self._writewaiters.append((name, future))
+        else:
+            _priority = priority.get()
+            _priority = NORMAL if _priority is None else min(max(_priority, INTERACTIVE), BULK)
+            self._waiters[_priority].setdefault(name, deque()).append(future)
+        self._wakeup()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(name)
+            raise
+        return name
+
+    def release(self, name: str):
+        self.active -= 1
+        self.running[name] -= 1
+        if self.running[name] == 0:
+            del self.running[name]
+        self._wakeup()
+
+    def setlimit(self, limit: int):
+        """Change the number of concurrent requests of the whole process"""
+        self.limit = limit
+        self._wakeup()
+
+    def slot(self, *, write: bool = False):
+        """Async context manager holding one request slot (write: use the write queue and reserved slots)"""
+        return _RequestSlot(self, write)
+
+
+class _RequestSlot:
+    def __init__(self, scheduler: RequestScheduler, write: bool = False):
+        self.scheduler = scheduler
+        self.write = write
+        self._name = None
+
+    async def __aenter__(self):
+        self._name = await self.scheduler.acquire(write=self.write)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler.release(self._name)
+        return False
+
+
+class WriteGovernor:
+    """AIMD concurrency and rate limiter for write requests
+
+    Arguments:
+        limit: float, by default 2
+            initial number of concurrent writes
+        minlimit / maxlimit: float, by default 1 / 8
+            bounds of concurrent writes
+        interval: float, by default 0.5
+            initial minimum seconds between starting two writes
+        mininterval / maxinterval: float, by default 0.1 / 30.0
+            bounds of the interval
+        latency: float, by default 5.0
+            writes slower than this (seconds) are treated as a congestion signal
+    """
+
+    def __init__(self, *, limit: float = 2, minlimit: float = 1, maxlimit: float = 8,
+                 interval: float = 0.5, mininterval: float = 0.1, maxinterval: float = 30.0,
+                 latency: float = 5.0):
+        self.limit = limit
+        self.minlimit = minlimit
+        self.maxlimit = maxlimit
+        self.interval = interval
+        self.mininterval = mininterval
+        self.maxinterval = maxinterval
+        self.latency = latency
+        self.active = 0
+        self._waiters = OrderedDict()  # type: OrderedDict[str, deque]
+        self._laststart = 0.0
+        self._startlock = None  # type: asyncio.Lock
+        self._startloop = None
+
+    def _wakeup(self):
+        # hand free slots to waiting jobs in round-robin order
+        while self.active < int(self.limit) and self._waiters:
+            name, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(name)
+            else:
+                del self._waiters[name]
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+    async def acquire(self):
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._waiters.setdefault(job.get(), deque()).append(future)
+        self._wakeup()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.active -= 1
+                self._wakeup()
+            raise
+
+        # keep the interval between starts (asyncio.Lock binds to one loop)
+        if self._startlock is None or self._startloop is not loop:
+            self._startlock = asyncio.Lock()
+            self._startloop = loop
+        try:
+            async with self._startlock:
+                _wait = self._laststart + self.interval - loop.time()
+                if _wait > 0:
+                    await asyncio.sleep(_wait)
+                self._laststart = loop.time()
+        except BaseException:
+            # the slot is already ours, give it back
+            self.active -= 1
+            self._wakeup()
+            raise
+
+    @contextmanager
+    def timing(self):
+        """Time the HTTP call of the current write slot
+
+        Used by connector inside the request slot, so that waiting for a slot is not counted as latency.
+        """
+        _slot = _writeslot.get()
+        if _slot is None:
+            yield
+            return
+        loop = asyncio.get_event_loop()
+        _start = loop.time()
+        try:
+            yield
+        finally:
+            _slot.elapsed = loop.time() - _start
+
+    def release(self, *, throttled: bool = False, elapsed: float = 0.0):
+        self.active -= 1
+        if throttled or elapsed > self.latency:
+            # multiplicative decrease
+            self.limit = max(self.minlimit, self.limit / 2)
+            self.interval = min(self.maxinterval, self.interval * 2)
+            logger.info(f"WriteGovernor | slow down | limit: {self.limit:.2f}, interval: {self.interval:.2f}")
+        else:
+            # additive increase (about +1 per window)
+            self.limit = min(self.maxlimit, self.limit + 1 / self.limit)
+            self.interval = max(self.mininterval, self.interval * 0.9)
+        self._wakeup()
+
+    def slot(self):
+        """Async context manager holding one write slot
+
+        Usage:
+            >>> async with governor.slot() as slot:
+            ...     r = await request()
+            ...     slot.throttled = r["status"] == "try_again"
+        """
+        return _Slot(self)
+
+
+class _Slot:
+    def __init__(self, governor: WriteGovernor):
+        self.governor = governor
+        self.throttled = False
+        self.elapsed = 0.0
+        self._token = None
+
+    async def __aenter__(self):
+        await self.governor.acquire()
+        self._token = _writeslot.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        _writeslot.reset(self._token)
+        self.governor.release(throttled=self.throttled, elapsed=self.elapsed)
+        return False
+
+
+async def workerpool(func: Callable[[Any], Awaitable], targets: Union[Iterable, AsyncIterator], *,
+                     limit: int = 10, ordered: bool = False, errors: Optional[list] = None):
+    """|Coroutine| Run `func` for every target with a bounded number of workers
+
+    Arguments:
+        func: Callable[[target], Awaitable]
+            coroutine function called with one target
+        targets: Union[Iterable, AsyncIterator]
+            targets, pulled lazily by the workers
+        limit: int, by default 10
+            number of workers = number of parallel executions
+            requests are also capped by requestscheduler.limit for the whole process (see requestscheduler.setlimit())
+        ordered: bool, by default False
+            True: yield results in the order of targets
+            False: yield results as they complete
+        errors: Optional[list], by default None
+            if given, a failed target does not stop the pool.
+            MassError is appended to this list and the target is left out of the results.
+
+    When the deadline of deadlinecontext() passes, no more targets are started
+    and the results so far are yielded without raising.
+    With `errors`, unfinished and (for non-async iterables) unstarted targets are recorded with status "deadline".
+
+    Raises:
+        Exception raised by `func` is re-raised after the other workers are cancelled (unless `errors` is given).
+
+    Yields:
+        result of func(target)
+    """
+    _pool = _workerpool(func, targets, limit=limit, ordered=ordered, errors=errors)
+    try:
+        async for r in _pool:
+            yield r
+    finally:
+        await _pool.aclose()
+
+
+async def _workerpool(func: Callable[[Any], Awaitable], targets: Union[Iterable, AsyncIterator], *,
+                      limit: int, ordered: bool, errors: Optional[list], indexed: bool = False):
+    # indexed (unordered only): yield (index of target, result)
+    if hasattr(targets, "__aiter__"):
+        _aiter = targets.__aiter__()
+
+        async def _next():
+            return await _aiter.__anext__()
+    else:
+        _iter = iter(targets)
+
+        async def _next():
+            try:
+                return next(_iter)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    limit = max(1, limit)
+    _window = limit * 2
+    _pull = asyncio.Lock()
+    _progress = asyncio.Condition()
+    _queue = asyncio.Queue(maxsize=limit)
+    _index = 0
+    _emitted = 0
+    _failed = object()
+    _stopped = []
+
+    async def _call(target):
+        _counter = [0]
+        token = attempts.set(_counter)
+        try:
+            return await func(target)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if expired():
+                # out of time: stop the pool and keep the results so far
+                if not _stopped:
+                    _stopped.append(True)
+                    logger.warning("WorkerPool | deadline exceeded, returning partial results")
+                if errors is not None:
+                    errors.append(MassError(
+                        target=target,
+                        exception=type(e).__name__,
+                        status=deadline.get().reason(),
+                        attempts=_counter[0],
+                        message=str(e.args[0]) if e.args else ""
+                    ))
+                return _failed
+            if errors is None:
+                raise
+            errors.append(MassError(
+                target=target,
+                exception=type(e).__name__,
+                status=_status(e),
+                attempts=_counter[0],
+                message=str(e.args[0]) if e.args else ""
+            ))
+            logger.warning(f"WorkerPool | {target} | {type(e).__name__}: {e.args}")
+            return _failed
+        finally:
+            attempts.reset(token)
+
+    async def _worker():
+        nonlocal _index
+        # bulk work yields to single calls unless the caller chose a priority
+        if priority.get() is None:
+            priority.set(BULK)
+        try:
+            while True:
+                async with _pull:
+                    if _stopped or expired():
+                        break
+                    try:
+                        target = await _next()
+                    except StopAsyncIteration:
+                        break
+                    i = _index
+                    _index += 1
+                if ordered:
+                    # do not run too far ahead of the first unfinished target
+                    async with _progress:
+                        await _progress.wait_for(lambda: i < _emitted + _window)
+                await _queue.put((i, await _call(target), None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await _queue.put((None, None, e))
+            return
+        await _queue.put(None)
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(limit)]
+    _finished = 0
+    _pending = {}
+    try:
+        while _finished < limit:
+            item = await _queue.get()
+            if item is None:
+                _finished += 1
+                continue
+            i, r, e = item
+            if e is not None:
+                raise e
+            if not ordered:
+                if r is not _failed:
+                    yield (i, r) if indexed else r
+                continue
+            _pending[i] = r
+            while _emitted in _pending:
+                r = _pending.pop(_emitted)
+                _emitted += 1
+                async with _progress:
+                    _progress.notify_all()
+                if r is not _failed:
+                    yield r
+
+        if errors is not None and expired() and not hasattr(targets, "__aiter__"):
+            # record unstarted targets so that they can be retried
+            _reason = deadline.get().reason()
+            for target in _iter:
+                errors.append(MassError(target=target, exception="DeadlineExceededError", status=_reason, attempts=0, message="Deadline exceeded"))
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def runpool(func: Callable[[Any], Awaitable], targets: Union[Iterable, AsyncIterator], *,
+                  limit: int = 10, ordered: bool = True, errors: Optional[list] = None) -> List[Any]:
+    """|Coroutine| workerpool() collected into a list (in the order of targets by default)"""
+    if not ordered:
+        return [r async for r in workerpool(func, targets, limit=limit, errors=errors)]
+
+    # collect as completed and sort afterwards, so that a slow target does not hold back the others
+    # (targets are passed as they are, so logs and MassError show the caller's targets)
+    _pool = _workerpool(func, targets, limit=limit, ordered=False, errors=errors, indexed=True)
+    try:
+        _r = [r async for r in _pool]
+    finally:
+        await _pool.aclose()
+    _r.sort(key=lambda x: x[0])
+    return [r for _, r in _r]
+
+
+class Hedger:
+    """Hedged requests for idempotent read modules
+
+    Arguments:
+        enabled: bool, by default False
+            whether to hedge at all
+        modules: Optional[set], by default None
+            AMC moduleNames to hedge (None: ListPages, ViewSource, WhoRatedPage, PageRevisionList, ForumViewThreadPosts)
+        percentile: float, by default 0.95
+            a duplicate request is sent when the response takes longer than this percentile of recent responses
+        budget: float, by default 0.05
+            maximum ratio of duplicate requests to hedgeable requests
+        window: int, by default 200
+            number of recent response times kept per module
+        minsamples: int, by default 20
+            no hedging until this many response times are known
+        mindelay: float, by default 0.2
+            lower bound of the hedging delay (seconds)
+    """
+
+    def __init__(self, *, enabled: bool = False, modules: Optional[set] = None, percentile: float = 0.95,
+                 budget: float = 0.05, window: int = 200, minsamples: int = 20, mindelay: float = 0.2):
+        self.enabled = enabled
+        self.modules = {
+            "list/ListPagesModule",
+            "viewsource/ViewSourceModule",
+            "pagerate/WhoRatedPageModule",
+            "history/PageRevisionListModule",
+            "forum/ForumViewThreadPostsModule"
+        } if modules is None else set(modules)
+        self.percentile = percentile
+        self.budget = budget
+        self.window = window
+        self.minsamples = minsamples
+        self.mindelay = mindelay
+        self.tokens = 0.0
+        self.hedged = 0
+        self.won = 0
+        self._latency = {}  # type: dict[str, deque]
+
+    def threshold(self, module: str) -> Optional[float]:
+        """Current hedging delay of the module (None: not enough samples)"""
+        _samples = self._latency.get(module)
+        if _samples is None or len(_samples) < self.minsamples:
+            return None
+        _sorted = sorted(_samples)
+        return max(self.mindelay, _sorted[min(len(_sorted) - 1, int(len(_sorted) * self.percentile))])
+
+    @contextmanager
+    def timing(self):
+        """Time the HTTP call of the current hedged attempt
+
+        Used by connector inside the request slot, so that waiting for a slot is not counted as latency.
+        """
+        _attempt = _hedgeattempt.get()
+        if _attempt is None:
+            yield
+            return
+        loop = asyncio.get_event_loop()
+        _start = loop.time()
+        _attempt["sent"].set()
+        yield
+        # only successful calls are recorded
+        _attempt["samples"].append(loop.time() - _start)
+
+    async def run(self, module: str, factory: Callable[[], Awaitable]):
+        """|Coroutine| Await factory(), hedging with a second factory() call when it is slow
+
+        Arguments:
+            module: str
+                AMC moduleName of the request
+            factory: Callable[[], Awaitable]
+                returns a new request coroutine on every call
+                the HTTP call in it should be wrapped with timing()
+        """
+        if not self.enabled or module not in self.modules:
+            return await factory()
+
+        samples = self._latency.setdefault(module, deque(maxlen=self.window))
+        tasks = []
+
+        def _start():
+            _attempt = {"sent": asyncio.Event(), "samples": samples}
+
+            async def _run():
+                # set in the task's own context
+                _hedgeattempt.set(_attempt)
+                return await factory()
+
+            tasks.append(asyncio.ensure_future(_run()))
+            return _attempt, tasks[-1]
+
+        # one request earns `budget` tokens, one hedge costs 1 token
+        self.tokens = min(1.0 + self.budget * self.window, self.tokens + self.budget)
+        delay = self.threshold(module)
+        try:
+            _attempt, first = _start()
+            if delay is None:
+                return await first
+
+            # the delay counts from sending the request, not from queueing for a slot
+            _sent = asyncio.ensure_future(_attempt["sent"].wait())
+            try:
+                await asyncio.wait({first, _sent}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                _sent.cancel()
+            if not first.done():
+                await asyncio.wait({first}, timeout=delay)
+            if first.done() or self.tokens < 1.0:
+                return await first
+
+            self.tokens -= 1.0
+            self.hedged += 1
+            logger.debug(f"Hedger | {module} | no response after {delay:.2f}sec, sending a duplicate request")
+            _, second = _start()
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.won += 1
+                        return task.result()
+            # both failed
+            return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# scheduler used by every HTTP request of wikidot.py
+requestscheduler = RequestScheduler()
+
+# governor used by connector.connect for every write action
+writegovernor = WriteGovernor()
+
+# hedging of read requests in connector.connect (disabled by default)
+hedger = Hedger()
@@ -15,14 +15,20 @@ license:
 """
 
 from . import base, decorator
-from typing import Optional
+from typing import Optional, List
 
 
 @decorator.execute
-async def getmembers(*, limit: int = 10, url: str):
-    return await base.site_getmembers_mass(limit=limit, url=url)
+async def getmembers(*, limit: int = 10, url: str, store: Optional[dict] = None, neworder: str = "dateJoined desc",
+                     pages: Optional[List[int]] = None, errors: Optional[list] = None):
+    return await base.site_getmembers_mass(limit=limit, url=url, store=store, neworder=neworder, pages=pages, errors=errors)
 
 
 @decorator.execute
 async def gethistory(*, url: str, limitpage: Optional[int] = None):
     return await base.site_gethistory(url=url, limitpage=limitpage)
+
+
+@decorator.execute
+async def gethistorysince(*, url: str, watermark: Optional[tuple], perpage: int = 50, limitpage: Optional[int] = None):
+    return await base.site_gethistory_since(url=url, watermark=watermark, perpage=perpage, limitpage=limitpage)
@@ -35,10 +35,15 @@ async def set_with_fullname(*, url: str, fullname: int, tags: Union[list, tuple]
 
 
 @decorator.execute
-async def replace(*, limit: int = 10, url: str, before: str, after: str, selector: Optional[dict] = None):
-    return await base.tag_replace(limit=limit, url=url, before=before, after=after, selector=selector)
+async def replace(*, limit: int = 10, url: str, before: str, after: str, selector: Optional[dict] = None, journalpath: Optional[str] = None):
+    return await base.tag_replace(limit=limit, url=url, before=before, after=after, selector=selector, journalpath=journalpath)
 
 
 @decorator.execute
-async def reset(*, limit: int = 10, url: str, tagset: Union[list, tuple], selector: dict):
-    return await base.tag_reset(limit=limit, url=url, tagset=tagset, selector=selector)
+async def reset(*, limit: int = 10, url: str, tagset: Union[list, tuple], selector: dict, journalpath: Optional[str] = None):
+    return await base.tag_reset(limit=limit, url=url, tagset=tagset, selector=selector, journalpath=journalpath)
+
+
+@decorator.execute
+async def reconcile(*, limit: int = 10, url: str, rules: list, dryrun: bool = False, journalpath: Optional[str] = None):
+    return await base.tag_reconcile(limit=limit, url=url, rules=rules, dryrun=dryrun, journalpath=journalpath)
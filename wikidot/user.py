@@ -14,6 +14,7 @@ license:
 
 """
 
+from typing import Optional
 from . import base, decorator
 
 
@@ -30,3 +31,8 @@ async def logout() -> bool:
 @decorator.execute
 async def getid(*, user) -> bool:
     return await base.user_getid(user=user)
+
+
+@decorator.execute
+async def getids(*, limit: int = 10, users: list, errors: Optional[list] = None) -> list:
+    return await base.user_getid_mass(limit=limit, users=users, errors=errors)
@@ -14,13 +14,23 @@ license:
 
 """
 
-from typing import List
+from typing import List, Optional
 from . import base, decorator
 
 
 @decorator.execute
-async def getvoter(*, limit: int = 10, url: str, targets: List[int]):
-    return await base.vote_getvoter_mass(limit=limit, url=url, targets=targets)
+async def getvoter(*, limit: int = 10, url: str, targets: List[int], errors: Optional[list] = None):
+    return await base.vote_getvoter_mass(limit=limit, url=url, targets=targets, errors=errors)
+
+
+@decorator.execute
+async def getmatrix(*, limit: int = 10, url: str, targets: List[int]):
+    return await base.vote_getmatrix(limit=limit, url=url, targets=targets)
+
+
+@decorator.execute
+async def sync(*, limit: int = 10, url: str, store: dict, ttl: Optional[float] = None, errors: Optional[list] = None, **kwargs):
+    return await base.vote_sync(limit=limit, url=url, store=store, ttl=ttl, errors=errors, **kwargs)
 
 
 @decorator.execute